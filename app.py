@@ -1,7 +1,13 @@
-from common.app_factory import create_app
-from common.config import settings
+import time
 
+_import_started = time.perf_counter()
 
-app = create_app(testing=settings.TESTING)
+from common.app_factory import create_app  # noqa: E402
+from common.config import settings  # noqa: E402
+from common.startup import startup_timings  # noqa: E402
+
+startup_timings["imports"] = time.perf_counter() - _import_started
 
 
+app = create_app(testing=settings.TESTING)
+
@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import os
+import sys
+
+from benchmarks.runner import (
+    compare_to_baseline,
+    create_bench_app,
+    load_json,
+    run_benchmarks,
+    save_json,
+)
+from benchmarks.seed import create_bench_engine, seed_users
+from users.hashing import password_hasher
+
+SCENARIOS = ["health", "login", "users_me", "create_user"]
+
+
+async def main(args) -> dict:
+    bench_engine = create_bench_engine(args.database_url)
+    try:
+        if not args.skip_seed:
+            await seed_users(bench_engine, args.users)
+        app = create_bench_app(bench_engine)
+        return await run_benchmarks(
+            app, args.users, args.requests, args.concurrency, args.scenarios
+        )
+    finally:
+        password_hasher.shutdown()
+        await bench_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Seed synthetic users and measure endpoint latency in-process."
+    )
+    parser.add_argument(
+        "--database-url", default="sqlite+aiosqlite:///bench.db"
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative regression against the baseline.",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store these results as the new baseline.",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    save_json(args.output, results)
+
+    print(f"{'scenario':<12} {'rps':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<12} {result['throughput_rps']:>10} {result['p50_ms']:>10} "
+            f"{result['p95_ms']:>10} {result['p99_ms']:>10}"
+        )
+
+    if args.update_baseline:
+        save_json(args.baseline, results)
+        sys.exit(0)
+
+    if os.path.exists(args.baseline):
+        regressions = compare_to_baseline(
+            results, load_json(args.baseline), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,147 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.seed import BENCH_PASSWORD, bench_username
+from common.app_factory import create_app
+from common.config import settings
+from db.access import get_db, get_read_db, get_sessionmaker
+
+
+def create_bench_app(bench_engine):
+    """Build the application with every session dependency on the bench DB."""
+    BenchSessionLocal = sessionmaker(
+        bench_engine, expire_on_commit=False, class_=AsyncSession
+    )
+
+    async def override_get_db():
+        async with BenchSessionLocal() as session:
+            yield session
+
+    app = create_app(testing=True)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_sessionmaker] = lambda: BenchSessionLocal
+    # The benchmark hammers /login from one address on purpose.
+    settings.RATE_LIMIT_ENABLED = False
+    return app
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+async def run_scenario(request_factory, total: int, concurrency: int) -> dict:
+    """Send ``total`` requests with ``concurrency`` in flight and time them."""
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while next(counter) < total:
+            started = time.perf_counter()
+            response = await request_factory()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_seconds": round(duration, 4),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_benchmarks(
+    app, seeded_users: int, requests: int, concurrency: int, scenarios: list[str]
+) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        def random_login():
+            return {
+                "username": bench_username(random.randrange(seeded_users)),
+                "password": BENCH_PASSWORD,
+            }
+
+        tokens = []
+        for _ in range(min(concurrency, seeded_users)):
+            response = await client.post("/login", data=random_login())
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+
+        new_users = itertools.count()
+        run_id = int(time.time())
+
+        def new_user():
+            name = f"bench_new_{run_id}_{next(new_users)}"
+            return {
+                "username": name,
+                "email": f"{name}@bench.example.com",
+                "password": BENCH_PASSWORD,
+            }
+
+        factories = {
+            "health": lambda: client.get("/health"),
+            "login": lambda: client.post("/login", data=random_login()),
+            "users_me": lambda: client.get(
+                "/users/me/",
+                headers={"Authorization": f"Bearer {random.choice(tokens)}"},
+            ),
+            "create_user": lambda: client.post("/users/", json=new_user()),
+        }
+
+        results = {}
+        for name in scenarios:
+            results[name] = await run_scenario(factories[name], requests, concurrency)
+        return results
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """List the scenarios whose p95 latency or throughput regressed."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']}ms > baseline {reference['p95_ms']}ms"
+            )
+        if result["throughput_rps"] < reference["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['throughput_rps']} rps < baseline "
+                f"{reference['throughput_rps']} rps"
+            )
+    return regressions
+
+
+def load_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path: str, data: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import re
+import time
+from collections import deque
+
+from common.config import settings
+from common.logger_config import logger
+from common.metrics import registry
+
+
+class AdmissionLimit:
+    """Concurrency limit with a short, bounded wait queue for one route.
+
+    Args:
+        max_concurrency (int): Requests handled at once.
+        max_queue (int): Requests allowed to wait for a slot.
+        max_wait (float): Longest a request waits for a slot, in seconds.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.shed = 0
+
+    def _bind(self):
+        # Futures belong to one loop; start over if used from another one.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._in_flight = 0
+            self._waiters.clear()
+        return loop
+
+    async def acquire(self) -> bool:
+        """Take a slot, or return False if the request should be shed."""
+        loop = self._bind()
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the wait timed out.
+                self.admitted += 1
+                return True
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self.shed += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter, if any.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+def _route_key(method: str, path: str) -> str:
+    return f"{method.upper()} {path.rstrip('/') or '/'}"
+
+
+class AdmissionController:
+    """Per-route admission limits, keyed by ``"METHOD /path"``.
+
+    Routes without a limit, such as /health or token checks, are never
+    queued or shed.
+    """
+
+    def __init__(self, limits: dict[str, int], max_queue: int, max_wait: float):
+        self.limits = {}
+        for route, max_concurrency in limits.items():
+            method, path = route.split(" ", 1)
+            self.limits[_route_key(method, path)] = AdmissionLimit(
+                max_concurrency, max_queue, max_wait
+            )
+
+    def limit_for(self, method: str, path: str) -> AdmissionLimit | None:
+        return self.limits.get(_route_key(method, path))
+
+    def stats(self) -> dict:
+        stats = {}
+        for route, limit in self.limits.items():
+            name = re.sub(r"\W+", "_", route).strip("_").lower()
+            for key, value in limit.stats().items():
+                stats[f"{name}_{key}"] = value
+        return stats
+
+
+admission_controller = AdmissionController(
+    settings.ADMISSION_LIMITS,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_wait=settings.ADMISSION_MAX_WAIT_SECONDS,
+)
+registry.register_collector("admission", admission_controller.stats)
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware shedding load on expensive routes before it piles up.
+
+    A request over its route's limit waits at most ``max_wait`` for a slot,
+    then gets 503 with Retry-After straight away. Overload then shows up as
+    cheap, fast rejections that clients can back off from, instead of a
+    queue that makes every request slow.
+    """
+
+    def __init__(self, app, controller: AdmissionController | None = None):
+        self.app = app
+        self.controller = controller or admission_controller
+        self.retry_after = settings.ADMISSION_RETRY_AFTER_SECONDS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.controller.limit_for(scope["method"], scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        if not await limit.acquire():
+            logger.warning(
+                f"Shed {scope['method']} {scope['path']} after "
+                f"{time.perf_counter() - started:.3f}s: over capacity."
+            )
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Server busy, retry later"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
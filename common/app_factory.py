@@ -1,30 +1,69 @@
+import asyncio
+import contextlib
+
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from db.engine import engine, AsyncSessionLocal
-from db.schemas import Base
-from users.services import create_initial_admin_user
+from common.config import settings
+from db.engine import AsyncSessionLocal, dispose_engines, engine
+from db.migrations import check_schema_version, migrate
+from common.logger_config import start_logging, stop_logging
+from common.admission import AdmissionControlMiddleware
+from common.metrics import MetricsMiddleware
+from common.startup import log_startup_report, startup_stage
+from users.audit import audit_log
+from users.hashing import password_hasher
+from users.keys import key_store, rotate_keys_forever
+from users.revocation import denylist, refresh_denylist_forever
+from users.sessions import purge_expired_sessions_forever
 from routes import router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
+    start_logging()
+    with startup_stage("schema_check"):
+        if settings.AUTO_MIGRATE:
+            await migrate(engine)
+        else:
+            await check_schema_version(engine)
+    with startup_stage("token_denylist"):
         async with AsyncSessionLocal() as session:
-            await create_initial_admin_user(session)
+            await denylist.rebuild(session)
+    if key_store.asymmetric:
+        with startup_stage("signing_keys"):
+            await asyncio.to_thread(key_store.rotate)
+    log_startup_report()
+    background_tasks = [
+        asyncio.create_task(purge_expired_sessions_forever(AsyncSessionLocal)),
+        asyncio.create_task(refresh_denylist_forever(AsyncSessionLocal)),
+    ]
+    if key_store.asymmetric:
+        background_tasks.append(asyncio.create_task(rotate_keys_forever(key_store)))
+    audit_task = asyncio.create_task(audit_log.run(AsyncSessionLocal))
     yield
     # Shutdown logic
-    await engine.dispose()
+    for task in background_tasks:
+        task.cancel()
+    # Cancelling the audit task drains its queue before the engine goes away.
+    audit_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await audit_task
+    password_hasher.shutdown()
+    await dispose_engines()
+    stop_logging()
     
     
 def create_app(testing: bool = False) -> FastAPI:
     if testing:
         app = FastAPI()
+        app.add_middleware(AdmissionControlMiddleware)
+        app.add_middleware(MetricsMiddleware)
         app.include_router(router)
         return app
     
     app = FastAPI(lifespan=lifespan)
+    app.add_middleware(AdmissionControlMiddleware)
+    app.add_middleware(MetricsMiddleware)
     app.include_router(router)
-    return app
\ No newline at end of file
+    return app
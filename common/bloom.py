@@ -0,0 +1,72 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """Probabilistic set answering "definitely absent" or "maybe present".
+
+    Args:
+        capacity (int): Number of items the filter is sized for.
+        error_rate (float): Wanted false positive rate at ``capacity`` items.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    @classmethod
+    def from_buffer(cls, buffer, num_bits: int, num_hashes: int) -> "BloomFilter":
+        """Wrap existing bits, e.g. a read-only mmap, without copying them."""
+        bloom = cls.__new__(cls)
+        bloom.capacity = None
+        bloom.error_rate = None
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom._bits = buffer
+        bloom._lock = threading.Lock()
+        bloom.count = None
+        return bloom
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+    def _positions(self, item: str):
+        # Kirsch-Mitzenmacher: two halves of one digest simulate k hashes.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        with self._lock:
+            for position in self._positions(item):
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._bits = bytearray(len(self._bits))
+            self.count = 0
+
+    def stats(self) -> dict:
+        return {
+            "items": self.count,
+            "bits": self.num_bits,
+            "hashes": self.num_hashes,
+        }
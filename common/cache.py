@@ -0,0 +1,519 @@
+import asyncio
+import json
+import math
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable
+from urllib.parse import urlsplit
+
+from common.config import settings
+from common.logger_config import logger
+
+
+class TTLCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Args:
+        max_size (int): Maximum number of entries kept.
+        ttl (float): Default time to live of an entry, in seconds.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys: Iterable[Hashable]) -> list[Any]:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CacheBackendError(Exception):
+    """Raised when a shared cache backend cannot be reached or errors."""
+
+
+class MemoryCacheBackend:
+    """Per-worker backend keeping values as objects in a TTLCache.
+
+    Args:
+        max_size (int): Maximum number of entries kept.
+        ttl (float): Default time to live of an entry, in seconds.
+    """
+
+    shared = False
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._counters: dict[str, int] = {}
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        return self._cache.get_many(keys)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, keys: list[str]):
+        for key in keys:
+            self._cache.delete(key)
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class SQLiteCacheBackend:
+    """Backend in a SQLite file shared by the workers of one host.
+
+    Args:
+        path (str): Path of the SQLite database file.
+        prune_every (int): Writes between two deletions of expired entries.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_counters ("
+            "key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _get_many(self, keys: list[str]) -> list[bytes | None]:
+        placeholders = ", ".join("?" * len(keys))
+        rows = self._connect().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+            "AND expires_at > ?",
+            (*keys, time.time()),
+        )
+        values = dict(rows.fetchall())
+        return [values.get(key) for key in keys]
+
+    def _set(self, key: str, value: bytes, ttl: float):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def _delete(self, keys: list[str]):
+        placeholders = ", ".join("?" * len(keys))
+        self._connect().execute(
+            f"DELETE FROM cache WHERE key IN ({placeholders})", keys
+        )
+
+    def _counter(self, key: str) -> int:
+        row = self._connect().execute(
+            "SELECT value FROM cache_counters WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _incr(self, key: str) -> int:
+        return self._connect().execute(
+            "INSERT INTO cache_counters (key, value) VALUES (?, 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1 RETURNING value",
+            (key,),
+        ).fetchone()[0]
+
+    def _clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return await self._call(self._get_many, keys)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._call(self._set, key, value, ttl)
+
+    async def delete(self, keys: list[str]):
+        await self._call(self._delete, keys)
+
+    async def counter(self, key: str) -> int:
+        return await self._call(self._counter, key)
+
+    async def incr(self, key: str) -> int:
+        return await self._call(self._incr, key)
+
+    async def clear(self):
+        await self._call(self._clear)
+
+    async def _call(self, func, *args):
+        try:
+            return await asyncio.to_thread(func, *args)
+        except sqlite3.Error as e:
+            raise CacheBackendError(str(e)) from e
+
+    def stats(self) -> dict:
+        return {}
+
+
+def _encode_command(*args) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts += [f"${len(data)}\r\n".encode(), data, b"\r\n"]
+    return b"".join(parts)
+
+
+def _read_reply(stream) -> Any:
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise CacheBackendError("Connection closed by the server")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body.decode()
+    if prefix == b"-":
+        raise CacheBackendError(body.decode())
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        return None if length == -1 else stream.read(length + 2)[:-2]
+    if prefix == b"*":
+        length = int(body)
+        return None if length == -1 else [_read_reply(stream) for _ in range(length)]
+    raise CacheBackendError(f"Unexpected reply: {line!r}")
+
+
+class RedisCacheBackend:
+    """Backend speaking the Redis protocol, shared by workers of every host.
+
+    A minimal RESP client is enough for the handful of commands used, so no
+    client library is needed. Each thread keeps its own connection.
+
+    Args:
+        url (str): ``redis://[:password@]host[:port][/db]``.
+        timeout (float): Socket timeout in seconds.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection((self.host, self.port), self.timeout)
+            stream = sock.makefile("rwb")
+            self._local.stream = stream
+            if self.password:
+                self._send(stream, "AUTH", self.password)
+            if self.db:
+                self._send(stream, "SELECT", self.db)
+        return stream
+
+    @staticmethod
+    def _send(stream, *args) -> Any:
+        stream.write(_encode_command(*args))
+        stream.flush()
+        return _read_reply(stream)
+
+    def _command(self, *args) -> Any:
+        try:
+            return self._send(self._connect(), *args)
+        except (OSError, CacheBackendError):
+            # Never reuse a connection left in an unknown state.
+            stream = getattr(self._local, "stream", None)
+            self._local.stream = None
+            if stream is not None:
+                stream.close()
+            raise
+
+    async def _call(self, *args) -> Any:
+        try:
+            return await asyncio.to_thread(self._command, *args)
+        except OSError as e:
+            raise CacheBackendError(str(e)) from e
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return await self._call("MGET", *keys)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._call("SET", key, value, "PX", max(int(ttl * 1000), 1))
+
+    async def delete(self, keys: list[str]):
+        await self._call("DEL", *keys)
+
+    async def counter(self, key: str) -> int:
+        value = await self._call("GET", key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return await self._call("INCR", key)
+
+    def stats(self) -> dict:
+        return {}
+
+
+class Cache:
+    """Namespaced cache over a memory, SQLite or Redis backend.
+
+    Shared backends store ``dumps(value)`` and every key embeds the namespace
+    version. ``clear`` bumps that version instead of scanning keys, and
+    workers pick the new version up within ``version_check_interval``;
+    ``delete`` is seen by every worker at once. Backend errors are logged
+    and treated as misses, so an unreachable cache only costs speed.
+
+    Args:
+        backend: Where entries are stored.
+        namespace (str): Prefix isolating this cache's keys.
+        ttl (float): Default time to live of an entry, in seconds.
+        dumps (Callable): Serializer used with shared backends.
+        loads (Callable): Deserializer used with shared backends.
+        version_check_interval (float): Seconds a namespace version is trusted.
+    """
+
+    def __init__(
+        self,
+        backend,
+        namespace: str,
+        ttl: float = 60.0,
+        dumps: Callable[[Any], str | bytes] = json.dumps,
+        loads: Callable[[str | bytes], Any] = json.loads,
+        version_check_interval: float = 1.0,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.version_check_interval = version_check_interval
+        self._version = 0
+        self._version_checked_at = -math.inf
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def _prefix(self) -> str:
+        if not self.backend.shared:
+            return f"{self.namespace}:"
+        now = time.monotonic()
+        if now - self._version_checked_at >= self.version_check_interval:
+            self._version = await self.backend.counter(f"{self.namespace}:version")
+            self._version_checked_at = now
+        return f"{self.namespace}:{self._version}:"
+
+    def _failed(self, action: str, error: Exception):
+        self.errors += 1
+        logger.warning(f"Cache {self.namespace} {action} failed: {error}")
+
+    async def get_many(self, keys: list[Hashable]) -> dict[Hashable, Any]:
+        """Return the cached values of ``keys``, leaving out the misses."""
+        if not keys:
+            return {}
+        try:
+            prefix = await self._prefix()
+            values = await self.backend.get_many([f"{prefix}{key}" for key in keys])
+        except CacheBackendError as e:
+            self._failed("read", e)
+            self.misses += len(keys)
+            return {}
+
+        found = {}
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            found[key] = self.loads(value) if self.backend.shared else value
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        return (await self.get_many([key])).get(key, default)
+
+    async def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        if self.backend.shared:
+            value = self.dumps(value)
+        try:
+            prefix = await self._prefix()
+            await self.backend.set(
+                f"{prefix}{key}", value, self.ttl if ttl is None else ttl
+            )
+        except CacheBackendError as e:
+            self._failed("write", e)
+
+    async def delete(self, *keys: Hashable):
+        try:
+            prefix = await self._prefix()
+            await self.backend.delete([f"{prefix}{key}" for key in keys])
+        except CacheBackendError as e:
+            self._failed("delete", e)
+
+    async def version(self) -> int:
+        """Return the namespace version, bumped by every ``clear``."""
+        try:
+            await self._prefix()
+        except CacheBackendError as e:
+            self._failed("version check", e)
+        return self._version
+
+    async def clear(self):
+        """Drop every entry, for every worker when the backend is shared."""
+        if not self.backend.shared:
+            await self.backend.clear()
+            return
+        try:
+            self._version = await self.backend.incr(f"{self.namespace}:version")
+            self._version_checked_at = time.monotonic()
+        except CacheBackendError as e:
+            self._failed("clear", e)
+
+    def stats(self) -> dict:
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight await the same result, or get the same exception. Nothing is kept
+    once the call finishes, so this is not a cache.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable, *args) -> Any:
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                return await self._lead(key, func, *args)
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Retry only if the leader was cancelled, not this caller.
+                if not future.cancelled():
+                    raise
+
+    async def _lead(self, key: Hashable, func: Callable, *args) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.calls += 1
+        try:
+            result = await func(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved in case no caller was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
+
+
+def build_cache_backend(max_size: int = 1024, ttl: float = 60.0):
+    """Create the backend selected by the CACHE_BACKEND setting."""
+    if settings.CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(settings.CACHE_SQLITE_PATH)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.CACHE_REDIS_URL)
+    return MemoryCacheBackend(max_size=max_size, ttl=ttl)
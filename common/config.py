@@ -1,5 +1,6 @@
 import os
 from functools import lru_cache
+from typing import Literal
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import model_validator
@@ -9,15 +10,118 @@ class Settings(BaseSettings):
 
     DATABASE_URL: str = Field(...)
     TEST_DATABASE_URL: str = Field(...)
+    DATABASE_READ_URLS: list[str] = Field(default_factory=list)
+
+    AUTO_MIGRATE: bool = False
+
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = Field(5, ge=1)
+    DB_MAX_OVERFLOW: int = Field(10, ge=0)
+    DB_POOL_TIMEOUT: float = Field(30.0, gt=0)
+    DB_POOL_RECYCLE: int = Field(3600)
+    DB_POOL_PRE_PING: bool = False
 
     SECRET_KEY: str = Field(..., min_length=32)
     ALGORITHM: str = Field(...)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(30)
 
+    # Used when ALGORITHM is RS256 or EdDSA instead of an HMAC one.
+    JWT_KEYS_DIR: str = "keys"
+    JWT_KEY_ROTATION_DAYS: float = Field(30.0, gt=0)
+    JWT_KEY_OVERLAP_SECONDS: float = Field(86400.0, ge=0)
+    JWT_KEY_CHECK_INTERVAL_SECONDS: float = Field(3600.0, gt=0)
+    JWKS_MAX_AGE_SECONDS: int = Field(3600, ge=0)
+
     FIRST_SUPERUSER_USERNAME: str = Field(...)
     FIRST_SUPERUSER_EMAIL: str = Field(...)
     FIRST_SUPERUSER_PASSWORD: str = Field(...)
 
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: dict[str, str] = Field(
+        default_factory=lambda: {
+            "aiosqlite": "WARNING",
+            "sqlalchemy": "WARNING",
+            "db.engine.TimedQueuePool": "WARNING",
+        }
+    )
+    LOG_FORMAT: Literal["standard", "json"] = "standard"
+    LOG_FILE: str | None = "app.log"
+    LOG_QUEUE_SIZE: int = Field(10_000, ge=1)
+    LOG_RATE_LIMIT: int = Field(20, ge=0)
+    LOG_RATE_LIMIT_INTERVAL: float = Field(60.0, gt=0)
+
+    PASSWORD_SCHEMES: list[Literal["bcrypt", "argon2"]] = Field(
+        default_factory=lambda: ["bcrypt"], min_length=1
+    )
+    BCRYPT_ROUNDS: int = Field(12, ge=4, le=31)
+    ARGON2_TIME_COST: int = Field(3, ge=1)
+    ARGON2_MEMORY_COST: int = Field(65536, ge=8)
+    ARGON2_PARALLELISM: int = Field(4, ge=1)
+
+    HASH_EXECUTOR: Literal["thread", "process"] = Field("thread")
+    HASH_MAX_WORKERS: int | None = Field(None, ge=1)
+    HASH_MAX_PENDING: int = Field(64, ge=1)
+    HASH_QUEUE_TIMEOUT_SECONDS: float = Field(5.0, gt=0)
+
+    CACHE_BACKEND: Literal["memory", "sqlite", "redis"] = "memory"
+    CACHE_SQLITE_PATH: str = "cache.db"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_VERSION_CHECK_SECONDS: float = Field(1.0, ge=0)
+
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = Field(10_000, ge=1)
+    USER_CACHE_TTL_SECONDS: float = Field(60.0, gt=0)
+
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_SIZE: int = Field(50_000, ge=1)
+
+    REFRESH_TOKEN_EXPIRE_DAYS: int = Field(14, ge=1)
+    SESSION_PURGE_INTERVAL_SECONDS: float = Field(3600.0, gt=0)
+    SESSION_PURGE_BATCH_SIZE: int = Field(1000, ge=1)
+
+    REVOCATION_BLOOM_CAPACITY: int = Field(100_000, ge=1)
+    REVOCATION_BLOOM_ERROR_RATE: float = Field(0.01, gt=0, lt=1)
+    REVOCATION_REFRESH_INTERVAL_SECONDS: float = Field(60.0, gt=0)
+
+    STATELESS_AUTH: bool = False
+    TOKEN_VERSION_CACHE_TTL_SECONDS: float = Field(5.0, gt=0)
+
+    ADMISSION_CONTROL_ENABLED: bool = True
+    # Concurrent requests allowed per "METHOD /path"; other routes are unlimited.
+    ADMISSION_LIMITS: dict[str, int] = Field(
+        default_factory=lambda: {
+            "POST /login": 32,
+            "POST /users/": 16,
+            "POST /users/bulk": 2,
+        }
+    )
+    ADMISSION_MAX_QUEUE: int = Field(64, ge=0)
+    ADMISSION_MAX_WAIT_SECONDS: float = Field(0.5, gt=0)
+    ADMISSION_RETRY_AFTER_SECONDS: int = Field(1, ge=1)
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "sqlite"] = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = "rate_limits.db"
+    LOGIN_RATE_LIMIT_PER_IP: int = Field(20, ge=1)
+    LOGIN_RATE_LIMIT_PER_USER: int = Field(10, ge=1)
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: float = Field(60.0, gt=0)
+    SIGNUP_RATE_LIMIT_PER_IP: int = Field(10, ge=1)
+    SIGNUP_RATE_LIMIT_WINDOW_SECONDS: float = Field(3600.0, gt=0)
+
+    BREACHED_PASSWORDS_FILE: str | None = None
+    # The Bloom pre-filter only pays off when the index does not fit in the
+    # page cache; a warm binary search is faster than its hashing.
+    BREACHED_PASSWORDS_BLOOM: bool = False
+
+    AUDIT_ENABLED: bool = True
+    AUDIT_QUEUE_SIZE: int = Field(10_000, ge=1)
+    AUDIT_BATCH_SIZE: int = Field(500, ge=1)
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = Field(1.0, gt=0)
+
+    INTROSPECT_MAX_TOKENS: int = Field(1000, ge=1)
+
+    BULK_IMPORT_BATCH_SIZE: int = Field(500, ge=1, le=5000)
+
     model_config = SettingsConfigDict(
         env_file=".env.test" if os.getenv("TESTING") == "1" else ".env",
     )
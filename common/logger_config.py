@@ -1,34 +1,176 @@
+import atexit
+import json
 import logging
 import logging.config
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
 
-LOGGING_CONFIG = {
-    "version": 1,
-    "disable_existing_loggers": False,  # No desactiva loggers ya existentes
-    "formatters": {
-        "standard": {
-            "format": "[%(asctime)s] %(levelname)s in %(module)s: %(message)s",
-        },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "standard",
-            "level": "DEBUG",  # Nivel de log que muestra en consola
-            "stream": "ext://sys.stdout",
-        },
-        "file": {
-            "class": "logging.FileHandler",
-            "formatter": "standard",
-            "level": "INFO",  # Guardamos en fichero a partir de INFO
-            "filename": "app.log",
-            "encoding": "utf8",
-        },
-    },
-    "root": {
-        "handlers": ["console", "file"],
-        "level": "DEBUG",  # Nivel global de logging
-    },
+from common.config import settings
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most ``rate`` records per logging call site and interval.
+
+    Records are grouped by logger and source line rather than by message, so
+    f-string messages such as "Invalid token for alice." share one window.
+    Repetitive messages are counted instead of written once the limit is hit;
+    the count is reported when the next interval opens. At most
+    ``max_entries`` windows are tracked, the oldest ones are dropped first.
+    Records above ``max_level``, errors by default, are never held back.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        interval: float = 60.0,
+        max_entries: int = 1024,
+        max_level: int = logging.WARNING,
+    ):
+        super().__init__()
+        self.rate = rate
+        self.interval = interval
+        self.max_level = max_level
+        self.max_entries = max_entries
+        # Ordered by window start, so expired windows are always at the front.
+        self._windows: OrderedDict[tuple[str, str, int], list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._windows:
+            start = next(iter(self._windows.values()))[0]
+            if now - start < self.interval and len(self._windows) < self.max_entries:
+                return
+            self._windows.popitem(last=False)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > self.max_level:
+            return True
+
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows.pop(key, None)
+                self._prune(now)
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = (
+                        f"{record.msg} ({suppressed} similar messages suppressed)"
+                    )
+                return True
+
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+
+            window[2] += 1
+            return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+FORMATTERS = {
+    "standard": logging.Formatter(
+        "[%(asctime)s] %(levelname)s in %(module)s: %(message)s"
+    ),
+    "json": JsonFormatter(),
 }
 
-logging.config.dictConfig(LOGGING_CONFIG)
+log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _build_handlers() -> list[logging.Handler]:
+    formatter = FORMATTERS[settings.LOG_FORMAT]
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+    handlers = [console]
+
+    if settings.LOG_FILE:
+        file = logging.FileHandler(settings.LOG_FILE, encoding="utf8")
+        file.setFormatter(formatter)
+        handlers.append(file)
+    return handlers
+
+
+def start_logging():
+    """Start the thread that writes queued records to the real handlers."""
+    global _listener
+    if _listener is not None:
+        return
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *_build_handlers(), respect_handler_level=True
+    )
+    _listener.start()
+
+
+def stop_logging():
+    """Flush every queued record and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def configure_logging():
+    """Route every record through a queue, so callers never wait on I/O.
+
+    Records wait in the queue until ``start_logging`` is called, by the app
+    lifespan or by a script's entry point.
+    """
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(
+        RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_LIMIT_INTERVAL)
+    )
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+
+configure_logging()
+atexit.register(stop_logging)
 logger = logging.getLogger(__name__)
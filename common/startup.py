@@ -0,0 +1,28 @@
+import time
+from contextlib import contextmanager
+
+from common.logger_config import logger
+from common.metrics import registry
+
+# Seconds spent in each startup stage of this worker.
+startup_timings: dict[str, float] = {}
+
+
+@contextmanager
+def startup_stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = time.perf_counter() - started
+
+
+def log_startup_report():
+    stages = ", ".join(
+        f"{name} {seconds * 1000:.1f} ms" for name, seconds in startup_timings.items()
+    )
+    total = sum(startup_timings.values()) * 1000
+    logger.info(f"Startup took {total:.1f} ms ({stages}).")
+
+
+registry.register_collector("startup_seconds", lambda: dict(startup_timings))
@@ -1,4 +1,4 @@
-from db.engine import AsyncSessionLocal
+from db.engine import AsyncSessionLocal, next_read_sessionmaker
 
 
 async def get_db():
@@ -9,3 +9,40 @@ async def get_db():
     """
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db():
+    """Function to get a read-only database session.
+
+    Sessions come from the read replicas, round robin, or from the primary
+    when none is configured. Never write through them.
+
+    Yields:
+        AsyncSession: Asynchronous database session.
+    """
+    async with next_read_sessionmaker()() as session:
+        yield session
+
+
+def get_sessionmaker():
+    """Function to get the session factory.
+
+    Streaming responses and background tasks run after the request's
+    dependencies are closed, so they open their own sessions from this.
+
+    Returns:
+        sessionmaker: Factory of asynchronous database sessions.
+    """
+    return AsyncSessionLocal
+
+
+def get_read_sessionmaker():
+    """Function to get a read-only session factory.
+
+    The streaming counterpart of ``get_read_db``: each request gets the next
+    read replica, round robin, or the primary when none is configured.
+
+    Returns:
+        sessionmaker: Factory of asynchronous read-only database sessions.
+    """
+    return next_read_sessionmaker()
@@ -1,9 +1,132 @@
+import functools
+import itertools
+import time
+
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from common.config import settings
+from common.metrics import registry, stage_duration
 
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL, echo=True, pool_recycle=3600)
+
+class PoolMetrics:
+    """Checkout counters of one engine's connection pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, waited: float):
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.metrics.checkouts += 1
+            self.metrics.record_wait(waited)
+            stage_duration.observe(waited, "pool_checkout")
+
+    def _do_return_conn(self, record):
+        self.metrics.checkins += 1
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _engine_kwargs(url: str) -> dict:
+    kwargs = {
+        "echo": settings.DB_ECHO,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    parsed_url = make_url(url)
+    # In-memory SQLite uses a single static connection, there is nothing to size.
+    if parsed_url.get_backend_name() == "sqlite" and parsed_url.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        return kwargs
+
+    kwargs.update(
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return kwargs
+
+
+def _build_engine(url: str):
+    return create_async_engine(url, **_engine_kwargs(url))
+
+
+engine = _build_engine(DATABASE_URL)
 AsyncSessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+read_engines = [_build_engine(url) for url in settings.DATABASE_READ_URLS]
+ReadSessionLocals = [
+    sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+    for read_engine in read_engines
+]
+_read_sessionmakers = itertools.cycle(ReadSessionLocals or [AsyncSessionLocal])
+
+
+def next_read_sessionmaker() -> sessionmaker:
+    """Pick the next read replica session factory, round robin.
+
+    Falls back to the primary when no read replica is configured.
+    """
+    return next(_read_sessionmakers)
+
+
+def pool_stats(async_engine=None) -> dict:
+    """Return the pool usage of an engine, the primary one by default."""
+    pool = (async_engine or engine).sync_engine.pool
+    stats = {"status": pool.status()}
+    if isinstance(pool, TimedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            checkouts=pool.metrics.checkouts,
+            checkins=pool.metrics.checkins,
+            wait_seconds_total=pool.metrics.wait_seconds_total,
+            wait_seconds_max=pool.metrics.wait_seconds_max,
+        )
+    return stats
+
+
+registry.register_collector("db_pool", pool_stats)
+for _index, _read_engine in enumerate(read_engines):
+    registry.register_collector(
+        f"db_pool_replica_{_index}", functools.partial(pool_stats, _read_engine)
+    )
+
+
+async def dispose_engines():
+    await engine.dispose()
+    for read_engine in read_engines:
+        await read_engine.dispose()
@@ -7,10 +7,15 @@ class UserNotFoundException(Exception):
 
 
 class UserAlreadyExistsException(Exception):
-    """Exception raised when a user already exists in the database."""
+    """Exception raised when a user already exists in the database.
 
-    def __init__(self, username: str):
+    ``field`` names the unique column that clashed, "username" or "email",
+    or is None when the database did not say.
+    """
+
+    def __init__(self, username: str, field: str | None = "username"):
         self.username = username
+        self.field = field
         super().__init__(f"User '{username}' already exists in the database.")
 
 
@@ -19,3 +24,15 @@ class DatabaseConnectionError(Exception):
 
     def __init__(self, message: str = "Could not connect to the database."):
         super().__init__(message)
+
+
+class SchemaVersionError(Exception):
+    """Exception raised when the database schema is not at the expected version."""
+
+    def __init__(self, found: int | None, expected: int):
+        self.found = found
+        self.expected = expected
+        super().__init__(
+            f"Database schema is at version {found}, expected {expected}. "
+            "Run `python scripts/manage_db.py migrate`."
+        )
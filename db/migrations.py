@@ -0,0 +1,242 @@
+from typing import Callable
+
+from sqlalchemy import Connection, bindparam, inspect, select, text, update
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from common.logger_config import logger
+from db.exceptions import SchemaVersionError
+from db.schemas import (
+    AuthEventsDB,
+    Base,
+    RevokedTokensDB,
+    SchemaVersionDB,
+    SessionsDB,
+    UsersDB,
+)
+from models.validators import normalize_email, normalize_username
+
+# Version 1 is the users table as created by the first releases.
+SCHEMA_VERSION = 6
+
+
+def _add_users_token_version(conn: Connection):
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "token_version" not in columns:
+        conn.execute(
+            text(
+                "ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"
+            )
+        )
+
+
+def _create_sessions(conn: Connection):
+    SessionsDB.__table__.create(conn, checkfirst=True)
+
+
+def _create_revoked_tokens(conn: Connection):
+    RevokedTokensDB.__table__.create(conn, checkfirst=True)
+
+
+def _create_auth_events(conn: Connection):
+    AuthEventsDB.__table__.create(conn, checkfirst=True)
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "last_login_at" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN last_login_at DATETIME"))
+
+
+def _add_users_normalized(conn: Connection):
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    for column in ("username_normalized", "email_normalized"):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {column} VARCHAR(255)"))
+    for index in UsersDB.__table__.indexes:
+        if index.name in (
+            "ix_users_username_normalized",
+            "ix_users_email_normalized",
+        ):
+            index.create(conn, checkfirst=True)
+    after_id = 0
+    while after_id := backfill_normalized_batch(conn, after_id=after_id)[0]:
+        pass
+
+
+# Steps bringing a database from version N - 1 to version N.
+MIGRATIONS: dict[int, Callable[[Connection], None]] = {
+    2: _add_users_token_version,
+    3: _create_sessions,
+    4: _create_revoked_tokens,
+    5: _create_auth_events,
+    6: _add_users_normalized,
+}
+
+
+def _read_version(conn: Connection) -> int | None:
+    inspector = inspect(conn)
+    if inspector.has_table(SchemaVersionDB.__tablename__):
+        return conn.execute(select(SchemaVersionDB.version)).scalar_one_or_none()
+    if inspector.has_table("users"):
+        # Created by create_all before schema versioning existed.
+        return 1
+    return None
+
+
+def _write_version(conn: Connection, version: int):
+    table = SchemaVersionDB.__table__
+    table.create(conn, checkfirst=True)
+    conn.execute(table.delete())
+    conn.execute(table.insert().values(id=1, version=version))
+
+
+def _migrate(conn: Connection) -> tuple[int | None, int]:
+    current = _read_version(conn)
+    if current is None:
+        Base.metadata.create_all(conn)
+        _write_version(conn, SCHEMA_VERSION)
+        return current, SCHEMA_VERSION
+
+    for version in range(current + 1, SCHEMA_VERSION + 1):
+        logger.info(f"Applying schema migration {version}...")
+        MIGRATIONS[version](conn)
+        _write_version(conn, version)
+    return current, max(current, SCHEMA_VERSION)
+
+
+async def migrate(engine: AsyncEngine) -> int:
+    """Create or upgrade the schema to SCHEMA_VERSION and return that version.
+
+    An empty database gets every table at once; an existing one only gets the
+    migrations it is missing. Meant to run once per deployment, not per worker.
+    """
+    async with engine.begin() as conn:
+        previous, version = await conn.run_sync(_migrate)
+    logger.info(f"Database schema migrated from version {previous} to {version}.")
+    return version
+
+
+async def get_schema_version(engine: AsyncEngine) -> int | None:
+    async with engine.connect() as conn:
+        return await conn.run_sync(_read_version)
+
+
+async def check_schema_version(engine: AsyncEngine):
+    """Fail fast when the database was not migrated to the code's version.
+
+    Raises:
+        SchemaVersionError: If the stored version differs from SCHEMA_VERSION.
+    """
+    try:
+        async with engine.connect() as conn:
+            version = (
+                await conn.execute(select(SchemaVersionDB.version))
+            ).scalar_one_or_none()
+    except (OperationalError, ProgrammingError):
+        # No schema_version table: never migrated.
+        version = None
+    if version != SCHEMA_VERSION:
+        raise SchemaVersionError(version, SCHEMA_VERSION)
+
+
+def backfill_normalized_batch(
+    conn: Connection, batch_size: int = 1000, after_id: int = 0
+) -> tuple[int, int, dict[str, int]]:
+    """Fill the normalized columns of one batch of users missing them.
+
+    Each column is filled on its own: a normalized username or email that
+    would clash with another user is left empty and logged, to be fixed by
+    hand, without holding back the other column.
+
+    Returns:
+        tuple[int, int, dict[str, int]]: The last id scanned, or 0 when done,
+        then the number of users updated and the clashes left per column.
+    """
+    rows = conn.execute(
+        select(
+            UsersDB.id,
+            UsersDB.username,
+            UsersDB.email,
+            UsersDB.username_normalized,
+            UsersDB.email_normalized,
+        )
+        .where(
+            UsersDB.id > after_id,
+            UsersDB.username_normalized.is_(None)
+            | UsersDB.email_normalized.is_(None),
+        )
+        .order_by(UsersDB.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0, 0, {"username": 0, "email": 0}
+
+    columns = {
+        "username": (
+            UsersDB.username_normalized,
+            {
+                row.id: normalize_username(row.username)
+                for row in rows
+                if row.username_normalized is None
+            },
+        ),
+        "email": (
+            UsersDB.email_normalized,
+            {
+                row.id: normalize_email(row.email)
+                for row in rows
+                if row.email_normalized is None
+            },
+        ),
+    }
+    originals = {row.id: row for row in rows}
+    updated_ids, clashes = set(), {field: 0 for field in columns}
+    for field, (column, normalized) in columns.items():
+        taken = set(
+            conn.execute(select(column).where(column.in_(normalized.values())))
+            .scalars()
+            .all()
+        )
+        values = []
+        for user_id, value in normalized.items():
+            if value in taken:
+                logger.warning(
+                    f"User {user_id} ({originals[user_id].username}) clashes with "
+                    f"another user on its normalized {field}, left for manual review."
+                )
+                clashes[field] += 1
+                continue
+            taken.add(value)
+            values.append({"uid": user_id, "new_value": value})
+            updated_ids.add(user_id)
+
+        if values:
+            conn.execute(
+                update(UsersDB)
+                .where(UsersDB.id == bindparam("uid"))
+                .values({column: bindparam("new_value")}),
+                values,
+            )
+    return rows[-1].id, len(updated_ids), clashes
+
+
+async def backfill_normalized(engine: AsyncEngine, batch_size: int = 1000) -> int:
+    """Fill the normalized columns of every user, committing each batch.
+
+    Migration 6 runs this too; run it again after a rolling deployment in
+    which older workers kept inserting users without normalized columns.
+    """
+    after_id, updated, clashes = 0, 0, {"username": 0, "email": 0}
+    while True:
+        async with engine.begin() as conn:
+            after_id, batch_updated, batch_clashes = await conn.run_sync(
+                backfill_normalized_batch, batch_size, after_id
+            )
+        if not after_id:
+            break
+        updated += batch_updated
+        for field, count in batch_clashes.items():
+            clashes[field] += count
+    logger.info(
+        f"Normalized {updated} users, {clashes['username']} usernames and "
+        f"{clashes['email']} emails left for review."
+    )
+    return updated
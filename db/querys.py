@@ -1,25 +1,117 @@
+import re
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
 from fastapi import Depends
-from sqlalchemy import select
-from db.access import get_db
-from db.exceptions import DatabaseConnectionError, UserNotFoundException
-from db.schemas import UsersDB
-from models.models import UserCreate, UserFeatures
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from common.cache import Cache, SingleFlight, TTLCache, build_cache_backend
+from common.config import settings
+from common.metrics import registry, timed_stage
+from db.access import get_db, get_sessionmaker
+from db.exceptions import (
+    DatabaseConnectionError,
+    UserAlreadyExistsException,
+    UserNotFoundException,
+)
+from db.schemas import AuthEventsDB, RevokedTokensDB, SessionsDB, UsersDB
+from models.models import UserCreate, UserFeatures, UserRecord
+from models.validators import normalize_email, normalize_username
+
+
+user_cache = Cache(
+    build_cache_backend(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS),
+    namespace="user",
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    dumps=UserRecord.to_json,
+    loads=UserRecord.from_json,
+    version_check_interval=settings.CACHE_VERSION_CHECK_SECONDS,
+)
+# Password hashes stay in this worker, by username with the token version
+# they were read at. Shared cache backends only get the rest of the record.
+password_hashes = TTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+# Columns that may be listed; the password hash is never exposed.
+LISTABLE_USER_FIELDS = ("id", "username", "email", "is_active")
+
+
+token_version_cache = Cache(
+    build_cache_backend(
+        settings.USER_CACHE_MAX_SIZE, settings.TOKEN_VERSION_CACHE_TTL_SECONDS
+    ),
+    namespace="token_version",
+    ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS,
+    version_check_interval=settings.CACHE_VERSION_CHECK_SECONDS,
+)
+
+
+async def invalidate_user(username: str, user_id: int | None = None):
+    """Drop a user from the lookup caches after it was created or changed.
+
+    With a shared cache backend this is seen by every worker.
+    """
+    await user_cache.delete(normalize_username(username))
+    password_hashes.delete(normalize_username(username))
+    if user_id is not None:
+        await token_version_cache.delete(user_id)
+
+
+# Concurrent lookups of one username share a single query.
+user_lookups = SingleFlight()
+
 
+registry.register_collector("user_cache", user_cache.stats)
+registry.register_collector("user_lookups", user_lookups.stats)
+registry.register_collector("password_hash_cache", password_hashes.stats)
+registry.register_collector("token_version_cache", token_version_cache.stats)
 
-async def get_user(username: str, db: Depends(get_db)):
+
+# Only the columns UserRecord needs, so no ORM object is built per lookup.
+_USER_RECORD_COLUMNS = (
+    UsersDB.id,
+    UsersDB.username,
+    UsersDB.email,
+    UsersDB.is_active,
+    UsersDB.password,
+    UsersDB.token_version,
+)
+
+
+@timed_stage("get_user")
+async def get_user(username: str, db: Depends(get_db)) -> UserRecord:
+    key = normalize_username(username)
+    if settings.USER_CACHE_ENABLED:
+        cached_user = await user_cache.get(key)
+        if cached_user is not None:
+            if cached_user.password is not None:
+                return cached_user
+            token_version, password = password_hashes.get(key, (None, None))
+            if token_version == cached_user.token_version:
+                return replace(cached_user, password=password)
+
+    return await user_lookups.do(key, _load_user, username, db)
+
+
+async def _cache_user(key: str, user: UserRecord):
+    await user_cache.set(key, user)
+    if user_cache.backend.shared:
+        password_hashes.set(key, (user.token_version, user.password))
+
+
+async def _load_user(username: str, db) -> UserRecord:
+    key = normalize_username(username)
     try:
-        stmt = select(UsersDB).where(UsersDB.username == username)
+        stmt = select(*_USER_RECORD_COLUMNS).where(UsersDB.username_normalized == key)
         result = await db.execute(stmt)
-        db_user = result.scalar_one_or_none()
-
-        if db_user:
-            return UserCreate(
-                id=db_user.id,
-                username=db_user.username,
-                email=db_user.email,
-                is_active=db_user.is_active,
-                password=db_user.password,
-            )
+        row = result.one_or_none()
+
+        if row:
+            user = UserRecord(*row)
+            if settings.USER_CACHE_ENABLED:
+                await _cache_user(key, user)
+            return user
 
         else:
             raise UserNotFoundException(username)
@@ -28,31 +120,485 @@ async def get_user(username: str, db: Depends(get_db)):
         raise e.message
 
 
-async def create_user_query(user: UserCreate, db: Depends(get_db)):
+@timed_stage("get_users")
+async def get_users(
+    usernames: list[str], db: Depends(get_db)
+) -> dict[str, UserRecord]:
+    """
+    Resolve many users at once, from the cache then with a single IN query.
+
+    Args:
+        usernames (list[str]): Usernames to resolve, duplicates allowed.
+        db (AsyncSession): The database session.
+
+    Returns:
+        dict[str, UserRecord]: The users found, by requested username.
+    """
+    keys = list(dict.fromkeys(normalize_username(username) for username in usernames))
+    users = {}
+    if settings.USER_CACHE_ENABLED:
+        users = await user_cache.get_many(keys)
+
+    missing = [key for key in keys if key not in users]
+    if missing:
+        result = await db.execute(
+            select(*_USER_RECORD_COLUMNS).where(
+                UsersDB.username_normalized.in_(missing)
+            )
+        )
+        for row in result:
+            user = UserRecord(*row)
+            key = normalize_username(user.username)
+            users[key] = user
+            if settings.USER_CACHE_ENABLED:
+                await _cache_user(key, user)
+    return {
+        username: users[normalize_username(username)]
+        for username in usernames
+        if normalize_username(username) in users
+    }
+
+
+@timed_stage("create_user_query")
+async def create_user_query(user: UserCreate, db: Depends(get_db)) -> UserCreate:
     """
-    Create a new user in the database.
+    Create a new user in the database with a single INSERT.
+
+    Uniqueness is enforced by the normalized username and email unique
+    indexes rather than a prior lookup, which also makes concurrent signups
+    safe.
 
     Args:
-        user (UserFeatures): The user data to be created.
+        user (UserCreate): The validated user, with its password already hashed.
         db (AsyncSession): The database session.
 
     Returns:
-        User: The created user object.
+        UserCreate: The created user, with its id.
+
+    Raises:
+        UserAlreadyExistsException: If the username or email is taken.
     """
+    stmt = insert(UsersDB).values(
+        username=user.username,
+        username_normalized=normalize_username(user.username),
+        email=user.email,
+        email_normalized=normalize_email(user.email),
+        password=user.password,
+        is_active=user.is_active,
+    )
     try:
-        db.add(user)
+        connection = await db.connection()
+        if connection.dialect.insert_returning:
+            result = await db.execute(stmt.returning(UsersDB.id))
+            user_id = result.scalar_one()
+        else:
+            result = await db.execute(stmt)
+            user_id = result.inserted_primary_key[0]
         await db.commit()
-        await db.refresh(user)
-        return user
+
+    except IntegrityError as e:
+        await db.rollback()
+        field = _conflicting_field(e)
+        value = user.email if field == "email" else user.username
+        raise UserAlreadyExistsException(value, field=field) from e
 
     except DatabaseConnectionError as e:
         raise e.message
 
-async def check_existing_user(db: Depends(get_db), username: str, email: str) -> bool:
-    existing_user = await db.execute(
-        select(UsersDB).where(
-            (UsersDB.username == username) | 
-            (UsersDB.email == email)
+    await invalidate_user(user.username, user_id)
+    return user.model_copy(update={"id": user_id, "token_version": 0})
+
+
+def _conflicting_field(error: IntegrityError) -> str | None:
+    # SQLite reports "UNIQUE constraint failed: users.email_normalized", MySQL
+    # "Duplicate entry ... for key 'ix_users_email_normalized'". Match the
+    # key name, since the duplicated value may itself contain "email".
+    match = re.search(r"(?:users\.|ix_users_)(email|username)", str(error.orig))
+    return match.group(1) if match else None
+
+
+async def get_token_version(user_id: int, db: Depends(get_db)) -> int | None:
+    """
+    Return the current token version of a user, or None if it does not exist.
+
+    Results are cached for TOKEN_VERSION_CACHE_TTL_SECONDS, which bounds how
+    long a revoked stateless token keeps working on other workers.
+    """
+    token_version = await token_version_cache.get(user_id)
+    if token_version is not None:
+        return token_version
+
+    result = await db.execute(
+        select(UsersDB.token_version).where(UsersDB.id == user_id)
+    )
+    token_version = result.scalar_one_or_none()
+    if token_version is not None:
+        await token_version_cache.set(user_id, token_version)
+    return token_version
+
+
+async def deactivate_user_query(username: str, db: Depends(get_db)) -> bool:
+    """
+    Deactivate a user and revoke every token issued to it.
+
+    Args:
+        username (str): The user to deactivate.
+        db (AsyncSession): The database session.
+
+    Returns:
+        bool: True if a user was deactivated.
+    """
+    result = await db.execute(
+        select(UsersDB.id).where(
+            UsersDB.username_normalized == normalize_username(username)
+        )
+    )
+    user_id = result.scalar_one_or_none()
+    if user_id is None:
+        return False
+
+    await db.execute(
+        update(UsersDB)
+        .where(UsersDB.id == user_id)
+        .values(is_active=False, token_version=UsersDB.token_version + 1)
+    )
+    await db.execute(_revoke_user_sessions_statement(user_id))
+    await db.commit()
+
+    await invalidate_user(username, user_id)
+    return True
+
+
+async def update_password_hash_query(
+    username: str, password_hash: str, db: Depends(get_db)
+):
+    """
+    Replace the stored password hash of a user.
+
+    Args:
+        username (str): The user whose hash changes.
+        password_hash (str): The new hash.
+        db (AsyncSession): The database session.
+    """
+    await db.execute(
+        update(UsersDB)
+        .where(UsersDB.username_normalized == normalize_username(username))
+        .values(password=password_hash)
+    )
+    await db.commit()
+    await invalidate_user(username)
+
+
+async def find_existing_users(
+    db: Depends(get_db), usernames: set[str], emails: set[str]
+) -> tuple[set[str], set[str]]:
+    """
+    Find which of the given normalized usernames and emails are already taken.
+
+    Runs a single set-based query, so a whole import batch is checked at once.
+
+    Returns:
+        tuple[set[str], set[str]]: The taken normalized usernames and emails.
+    """
+    if not usernames and not emails:
+        return set(), set()
+
+    result = await db.execute(
+        select(UsersDB.username_normalized, UsersDB.email_normalized).where(
+            or_(
+                UsersDB.username_normalized.in_(usernames),
+                UsersDB.email_normalized.in_(emails),
+            )
         )
     )
-    return existing_user.scalars().first() is not None
\ No newline at end of file
+    taken_usernames, taken_emails = set(), set()
+    for username, email in result:
+        if username in usernames:
+            taken_usernames.add(username)
+        if email in emails:
+            taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+async def bulk_insert_users(rows: list[dict], db: Depends(get_db)):
+    """
+    Insert many users with one multi-row INSERT and commit them.
+
+    Args:
+        rows (list[dict]): Column values of the users to insert.
+        db (AsyncSession): The database session.
+    """
+    if not rows:
+        return
+    await db.execute(insert(UsersDB).values(rows))
+    await db.commit()
+
+
+def _list_users_statement(
+    fields: list[str], after_id: int | None = None, limit: int | None = None
+):
+    # The id is always selected, it is the keyset cursor.
+    columns = [UsersDB.id] + [getattr(UsersDB, f) for f in fields if f != "id"]
+    stmt = select(*columns).order_by(UsersDB.id)
+    if after_id is not None:
+        stmt = stmt.where(UsersDB.id > after_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+async def list_users_query(
+    db: Depends(get_db),
+    fields: list[str],
+    after_id: int | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    """
+    Return one page of users ordered by id, starting after ``after_id``.
+
+    Pages are found by seeking on the primary key index, so deep pages cost
+    the same as the first one.
+    """
+    result = await db.execute(_list_users_statement(fields, after_id, limit))
+    return [dict(row._mapping) for row in result]
+
+
+async def stream_users_query(
+    session_factory: Depends(get_sessionmaker),
+    fields: list[str],
+    after_id: int | None = None,
+    yield_per: int = 1000,
+) -> AsyncIterator[dict]:
+    """
+    Stream every user after ``after_id`` through a server-side cursor.
+
+    Rows are fetched ``yield_per`` at a time, so memory use stays constant
+    whatever the table size.
+    """
+    stmt = _list_users_statement(fields, after_id).execution_options(
+        yield_per=yield_per
+    )
+    async with session_factory() as session:
+        result = await session.stream(stmt)
+        async for row in result:
+            yield dict(row._mapping)
+
+
+def utcnow() -> datetime:
+    """Current UTC time as a naive datetime, the way DateTime columns store it."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def create_session_query(
+    user_id: int, token_hash: str, expires_at: datetime, db: Depends(get_db)
+):
+    """
+    Store a new refresh token session.
+
+    Args:
+        user_id (int): The owner of the session.
+        token_hash (str): SHA-256 hex digest of the refresh token.
+        expires_at (datetime): Naive UTC expiry of the refresh token.
+        db (AsyncSession): The database session.
+    """
+    await db.execute(
+        insert(SessionsDB).values(
+            user_id=user_id, token_hash=token_hash, expires_at=expires_at
+        )
+    )
+    await db.commit()
+
+
+async def get_session_query(token_hash: str, db: Depends(get_db)):
+    """
+    Find a refresh token session and its user with one indexed lookup.
+
+    Returns:
+        tuple[SessionsDB, UsersDB] | None: The session and its user.
+    """
+    result = await db.execute(
+        select(SessionsDB, UsersDB)
+        .join(UsersDB, UsersDB.id == SessionsDB.user_id)
+        .where(SessionsDB.token_hash == token_hash)
+    )
+    return result.one_or_none()
+
+
+async def rotate_session_query(
+    session_id: int,
+    user_id: int,
+    new_token_hash: str,
+    expires_at: datetime,
+    db: Depends(get_db),
+) -> bool:
+    """
+    Replace a refresh token session by a new one.
+
+    The old session is only marked rotated if nobody rotated it first, so two
+    concurrent refreshes with the same token cannot both succeed.
+
+    Returns:
+        bool: False if the session was already rotated or revoked.
+    """
+    result = await db.execute(
+        update(SessionsDB)
+        .where(
+            SessionsDB.id == session_id,
+            SessionsDB.rotated_at.is_(None),
+            SessionsDB.revoked_at.is_(None),
+        )
+        .values(rotated_at=utcnow())
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return False
+
+    await db.execute(
+        insert(SessionsDB).values(
+            user_id=user_id, token_hash=new_token_hash, expires_at=expires_at
+        )
+    )
+    await db.commit()
+    return True
+
+
+def _revoke_user_sessions_statement(user_id: int):
+    return (
+        update(SessionsDB)
+        .where(SessionsDB.user_id == user_id, SessionsDB.revoked_at.is_(None))
+        .values(revoked_at=utcnow())
+    )
+
+
+async def revoke_user_sessions_query(user_id: int, db: Depends(get_db)):
+    """Revoke every refresh token session of a user."""
+    await db.execute(_revoke_user_sessions_statement(user_id))
+    await db.commit()
+
+
+async def purge_expired_sessions_query(
+    db: Depends(get_db), batch_size: int = 1000
+) -> int:
+    """
+    Delete expired sessions in batches, committing after each one.
+
+    Short batches keep locks brief on a busy sessions table.
+
+    Returns:
+        int: The number of sessions deleted.
+    """
+    purged = 0
+    while True:
+        expired_ids = (
+            await db.execute(
+                select(SessionsDB.id)
+                .where(SessionsDB.expires_at < utcnow())
+                .limit(batch_size)
+            )
+        ).scalars().all()
+        if not expired_ids:
+            return purged
+
+        await db.execute(delete(SessionsDB).where(SessionsDB.id.in_(expired_ids)))
+        await db.commit()
+        purged += len(expired_ids)
+
+
+async def revoke_session_query(token_hash: str, db: Depends(get_db)):
+    """Revoke the refresh token session matching ``token_hash``, if any."""
+    await db.execute(
+        update(SessionsDB)
+        .where(SessionsDB.token_hash == token_hash, SessionsDB.revoked_at.is_(None))
+        .values(revoked_at=utcnow())
+    )
+    await db.commit()
+
+
+async def revoke_token_query(jti: str, expires_at: datetime, db: Depends(get_db)):
+    """
+    Add an access token id to the denylist until the token expires.
+
+    Revoking the same token twice is a no-op.
+    """
+    try:
+        await db.execute(insert(RevokedTokensDB).values(jti=jti, expires_at=expires_at))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+
+
+async def is_token_revoked_query(jti: str, db: Depends(get_db)) -> bool:
+    """Check the denylist for an access token id with a primary key lookup."""
+    result = await db.execute(
+        select(RevokedTokensDB.jti).where(RevokedTokensDB.jti == jti)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def find_revoked_jtis_query(jtis: list[str], db: Depends(get_db)) -> set[str]:
+    """Return which of ``jtis`` are on the denylist, with one IN query."""
+    if not jtis:
+        return set()
+    result = await db.execute(
+        select(RevokedTokensDB.jti).where(RevokedTokensDB.jti.in_(jtis))
+    )
+    return set(result.scalars().all())
+
+
+async def list_revoked_jtis_query(db: Depends(get_db)) -> list[str]:
+    """Return the ids of every revoked token that has not expired yet."""
+    result = await db.execute(
+        select(RevokedTokensDB.jti).where(RevokedTokensDB.expires_at >= utcnow())
+    )
+    return list(result.scalars().all())
+
+
+async def purge_revoked_tokens_query(db: Depends(get_db)) -> int:
+    """
+    Delete denylist entries whose token has expired.
+
+    An expired token is rejected by its ``exp`` claim, so its entry is useless.
+
+    Returns:
+        int: The number of entries deleted.
+    """
+    result = await db.execute(
+        delete(RevokedTokensDB).where(RevokedTokensDB.expires_at < utcnow())
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def insert_auth_events_query(events: list[dict], db: Depends(get_db)):
+    """
+    Store audit events with one multi-row INSERT and record last logins.
+
+    Only the latest successful login of each user is written, so a user
+    logging in many times between two flushes costs one UPDATE.
+
+    Args:
+        events (list[dict]): Rows of the auth_events table.
+        db (AsyncSession): The database session.
+    """
+    if not events:
+        return
+
+    await db.execute(insert(AuthEventsDB).values(events))
+
+    last_logins = {}
+    for event in events:
+        user_id = event["user_id"]
+        if event["event"] == "login" and event["outcome"] == "success" and user_id:
+            last_logins[user_id] = max(
+                event["created_at"], last_logins.get(user_id, event["created_at"])
+            )
+    if last_logins:
+        # Bulk UPDATE by primary key: one executemany for every user.
+        await db.execute(
+            update(UsersDB),
+            [
+                {"id": user_id, "last_login_at": last_login_at}
+                for user_id, last_login_at in last_logins.items()
+            ],
+        )
+    await db.commit()
@@ -1,13 +1,99 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+)
 from sqlalchemy.orm import declarative_base 
 
+from models.validators import normalize_email, normalize_username
+
 Base = declarative_base()
 
 
+def _normalized(column: str, normalize):
+    # Computed at INSERT time from the raw value, for ORM and Core inserts alike.
+    def default(context):
+        value = context.get_current_parameters().get(column)
+        return normalize(value) if value is not None else None
+
+    return default
+
+
 class UsersDB(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     username = Column(String(255), unique=True, index=True)
     password = Column(String(255), nullable=False)
     email = Column(String(255), unique=True, index=True)
+    # Lookups and uniqueness go through these, so "Alice" and "alice" clash
+    # while every query still hits an index.
+    username_normalized = Column(
+        String(255),
+        unique=True,
+        index=True,
+        default=_normalized("username", normalize_username),
+    )
+    email_normalized = Column(
+        String(255),
+        unique=True,
+        index=True,
+        default=_normalized("email", normalize_email),
+    )
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    last_login_at = Column(DateTime, nullable=True)
+
+
+class SessionsDB(Base):
+    """Refresh token sessions; only a SHA-256 digest of each token is stored."""
+
+    __tablename__ = "sessions"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)
+    rotated_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_sessions_user_id_expires_at", "user_id", "expires_at"),)
+
+
+class RevokedTokensDB(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class AuthEventsDB(Base):
+    """Audit trail of logins, refreshes and signups, written in batches."""
+
+    __tablename__ = "auth_events"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event = Column(String(32), nullable=False)
+    outcome = Column(String(32), nullable=False)
+    username = Column(String(255), nullable=True)
+    user_id = Column(Integer, nullable=True)
+    ip = Column(String(45), nullable=True)
+    user_agent = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_auth_events_username_created_at", "username", "created_at"),
+    )
+
+
+class SchemaVersionDB(Base):
+    __tablename__ = "schema_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime, nullable=False, server_default=func.now())
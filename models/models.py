@@ -1,9 +1,45 @@
+import json
+from dataclasses import asdict, dataclass
+from typing import Optional
+
 from pydantic import BaseModel
 from .validators import UserValidator
 
 
 class UserCreate(UserValidator):
-    pass
+    id: Optional[int] = None
+    token_version: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """A stored user as read on the authentication hot path.
+
+    Rows come from the database, so they are not validated again; pydantic
+    models are reserved for input. ``password`` is None when the record was
+    read from a shared cache, which never receives the hash.
+    """
+
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    password: str | None
+    token_version: int
+
+    def to_json(self) -> str:
+        return json.dumps({**asdict(self), "password": None})
+
+    @classmethod
+    def from_json(cls, data: str | bytes) -> "UserRecord":
+        return cls(**json.loads(data))
+
+
+class UserPublic(BaseModel):
+    id: Optional[int] = None
+    username: str
+    email: str
+    is_active: Optional[bool] = True
 
 
 class UserFeatures(BaseModel):
@@ -15,7 +51,38 @@ class UserFeatures(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class RevokeTokenRequest(BaseModel):
+    token: str
+
+
+class IntrospectRequest(BaseModel):
+    tokens: list[str]
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: Optional[str] = None
+    uid: Optional[int] = None
+    email: Optional[str] = None
+    exp: Optional[int] = None
+    jti: Optional[str] = None
+
+
+class IntrospectResponse(BaseModel):
+    results: list[TokenIntrospection]
 
 
 class TokenData(BaseModel):
     username: str | None = None
+
+
+class UserPage(BaseModel):
+    items: list[dict]
+    next_after: Optional[int] = None
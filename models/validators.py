@@ -4,6 +4,16 @@ import re
 from typing import Optional
 
 
+def normalize_username(username: str) -> str:
+    """Case-insensitive form of a username, used for lookups and uniqueness."""
+    return username.strip().casefold()
+
+
+def normalize_email(email: str) -> str:
+    """Case-insensitive form of an email, used for lookups and uniqueness."""
+    return email.strip().casefold()
+
+
 class PasswordValidator(BaseModel):
     password: str
 
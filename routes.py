@@ -1,23 +1,65 @@
-from fastapi import APIRouter, Depends
+import json
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from models.models import Token
 
 from datetime import timedelta
-from typing import Annotated
+from typing import Annotated, Literal
 from sqlalchemy.orm import Session
 
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordRequestForm
+from jwt.exceptions import InvalidTokenError
 
-from db.access import get_db
-from db.querys import check_existing_user, create_user_query
-from db.schemas import  UsersDB
-from models.models import Token, UserCreate, UserFeatures
-from users.exceptions import CredentialsException
+from db.access import get_db, get_read_db, get_read_sessionmaker, get_sessionmaker
+from db.exceptions import UserAlreadyExistsException
+from db.querys import (
+    LISTABLE_USER_FIELDS,
+    create_user_query,
+    revoke_session_query,
+    list_users_query,
+    stream_users_query,
+)
+from common.config import settings
+from common.metrics import registry
+from models.models import (
+    IntrospectRequest,
+    IntrospectResponse,
+    RefreshRequest,
+    RevokeTokenRequest,
+    Token,
+    UserFeatures,
+    UserPage,
+    UserPublic,
+)
+from models.validators import normalize_username
+from users.audit import audit_log
+from users.bulk_import import (
+    import_users,
+    iter_spooled_lines,
+    parse_records,
+    spool_chunks,
+)
+from users.rate_limit import rate_limiter
+from users.helper import oauth2_scheme
+from users.keys import key_store
+from users.sessions import hash_refresh_token, issue_refresh_token, refresh_session
+from users.exceptions import (
+    CredentialsException,
+    InvalidRequestException,
+    TooManyRequestsException,
+    UserConflictException,
+)
 from users.services import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    access_token_claims,
     authenticate_user,
     create_access_token,
     get_current_active_user,
+    get_current_superuser,
+    introspect_tokens,
+    revoke_access_token,
     validate_user,
 )
 router = APIRouter()
@@ -27,38 +69,230 @@ async def health_check():
     return {"status": "ok"}
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks():
+    return JSONResponse(
+        key_store.jwks() if key_store.asymmetric else {"keys": []},
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}"},
+    )
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
+    request: Request,
+    background_tasks: BackgroundTasks,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
+    write_db: Session = Depends(get_db),
+    session_factory=Depends(get_sessionmaker),
 ):
-    user = await authenticate_user(form_data.username, form_data.password, db)
+    window = settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+    try:
+        await rate_limiter.check(
+            f"login:ip:{_client_ip(request)}", settings.LOGIN_RATE_LIMIT_PER_IP, window
+        )
+        await rate_limiter.check(
+            f"login:user:{normalize_username(form_data.username)}",
+            settings.LOGIN_RATE_LIMIT_PER_USER,
+            window,
+        )
+    except TooManyRequestsException:
+        audit_log.record(
+            "login", "throttled", username=form_data.username, request=request
+        )
+        raise
+
+    user = await authenticate_user(
+        form_data.username,
+        form_data.password,
+        db,
+        background_tasks=background_tasks,
+        session_factory=session_factory,
+    )
     if not user:
+        audit_log.record(
+            "login", "invalid_credentials", username=form_data.username, request=request
+        )
         raise CredentialsException(detail=["Invalid username or password"])
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=access_token_claims(user), expires_delta=access_token_expires
+    )
+    refresh_token = await issue_refresh_token(user.id, write_db)
+    audit_log.record(
+        "login", "success", username=user.username, user_id=user.id, request=request
     )
-    return Token(access_token=access_token, token_type="bearer")
+    return Token(
+        access_token=access_token, token_type="bearer", refresh_token=refresh_token
+    )
+
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(
+    request: Request, body: RefreshRequest, db: Session = Depends(get_db)
+):
+    try:
+        token, username, user_id = await refresh_session(body.refresh_token, db)
+    except CredentialsException:
+        audit_log.record("refresh", "rejected", request=request)
+        raise
+    audit_log.record(
+        "refresh", "success", username=username, user_id=user_id, request=request
+    )
+    return token
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    current_user: Annotated[UserPublic, Depends(get_current_active_user)],
+    body: RefreshRequest | None = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        await revoke_access_token(token, db)
+    except InvalidTokenError:
+        raise CredentialsException(detail=["Invalid token"]) from None
+    if body is not None:
+        await revoke_session_query(hash_refresh_token(body.refresh_token), db)
 
 
-@router.get("/users/me/", response_model=UserCreate)
+@router.post("/tokens/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_token(
+    body: RevokeTokenRequest,
+    current_user: Annotated[UserPublic, Depends(get_current_superuser)],
+    db: Session = Depends(get_db),
+):
+    try:
+        await revoke_access_token(body.token, db)
+    except InvalidTokenError:
+        raise InvalidRequestException(detail="Invalid or unrevocable token") from None
+
+
+@router.post("/tokens/introspect", response_model=IntrospectResponse)
+async def introspect(
+    body: IntrospectRequest,
+    current_user: Annotated[UserPublic, Depends(get_current_superuser)],
+    db: Session = Depends(get_read_db),
+):
+    if len(body.tokens) > settings.INTROSPECT_MAX_TOKENS:
+        raise InvalidRequestException(
+            detail=f"At most {settings.INTROSPECT_MAX_TOKENS} tokens per request"
+        )
+    return IntrospectResponse(results=await introspect_tokens(body.tokens, db))
+
+
+@router.get("/users/me/", response_model=UserPublic)
 async def read_users_me(
-    current_user: Annotated[UserCreate, Depends(get_current_active_user)],
+    current_user: Annotated[UserPublic, Depends(get_current_active_user)],
 ):
     return current_user
 
 
-@router.post("/users/", response_model=UserCreate)
-async def create_user(input_user: UserFeatures, db: Session = Depends(get_db)):
-    if await check_existing_user(db, input_user.username, input_user.email):
-        raise CredentialsException(detail=["Username or email already exists"])
-    
-    
-    validated_user = validate_user(input_user)
-    
-    db_user = UsersDB(**validated_user.model_dump())
-    created_user = await create_user_query(db_user, db)
-    
+@router.post("/users/", response_model=UserPublic)
+async def create_user(
+    request: Request,
+    input_user: UserFeatures,
+    db: Session = Depends(get_db),
+):
+    await rate_limiter.check(
+        f"signup:ip:{_client_ip(request)}",
+        settings.SIGNUP_RATE_LIMIT_PER_IP,
+        settings.SIGNUP_RATE_LIMIT_WINDOW_SECONDS,
+    )
+    validated_user = await validate_user(input_user)
+
+    try:
+        created_user = await create_user_query(validated_user, db)
+    except UserAlreadyExistsException as e:
+        audit_log.record(
+            "user_created",
+            "conflict",
+            username=validated_user.username,
+            request=request,
+        )
+        if e.field is None:
+            raise UserConflictException(
+                detail=["Username or email already exists"]
+            ) from None
+        raise UserConflictException(
+            detail=[f"{e.field.capitalize()} already exists"]
+        ) from None
+
+    audit_log.record(
+        "user_created",
+        "success",
+        username=created_user.username,
+        user_id=created_user.id,
+        request=request,
+    )
     return created_user
+
+
+async def _stream_import(session_factory, spool, format: str):
+    # The request's session is closed before a streamed body is sent.
+    async with session_factory() as session:
+        records = parse_records(iter_spooled_lines(spool), format)
+        async for result in import_users(
+            records, session, batch_size=settings.BULK_IMPORT_BATCH_SIZE
+        ):
+            yield json.dumps(result) + "\n"
+
+
+@router.post("/users/bulk")
+async def bulk_create_users(
+    request: Request,
+    current_user: Annotated[UserPublic, Depends(get_current_superuser)],
+    session_factory=Depends(get_sessionmaker),
+    format: Annotated[Literal["jsonl", "csv"] | None, Query()] = None,
+):
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if content_type.startswith("text/csv") else "jsonl"
+
+    spool = await spool_chunks(request.stream())
+    return StreamingResponse(
+        _stream_import(session_factory, spool, format),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/users/", response_model=UserPage)
+async def list_users(
+    current_user: Annotated[UserPublic, Depends(get_current_superuser)],
+    db: Session = Depends(get_read_db),
+    session_factory=Depends(get_read_sessionmaker),
+    after: Annotated[int | None, Query(ge=0)] = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    fields: Annotated[str, Query()] = ",".join(LISTABLE_USER_FIELDS),
+    format: Annotated[Literal["json", "ndjson"], Query()] = "json",
+):
+    columns = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(columns) - set(LISTABLE_USER_FIELDS)
+    if unknown:
+        raise InvalidRequestException(
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+
+    if format == "ndjson":
+        rows = stream_users_query(session_factory, columns, after_id=after)
+        return StreamingResponse(
+            (json.dumps(row) + "\n" async for row in rows),
+            media_type="application/x-ndjson",
+        )
+
+    items = await list_users_query(db, columns, after_id=after, limit=limit)
+    next_after = items[-1]["id"] if len(items) == limit else None
+    return UserPage(items=items, next_after=next_after)
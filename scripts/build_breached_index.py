@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+
+from common.logger_config import logger, start_logging
+from users.breached import (
+    MAX_PREFIX_BYTES,
+    MIN_PREFIX_BYTES,
+    build_index,
+    parse_dump_line,
+)
+
+
+def prefix_bytes(value: str) -> int:
+    number = int(value)
+    if not MIN_PREFIX_BYTES <= number <= MAX_PREFIX_BYTES:
+        raise argparse.ArgumentTypeError(
+            f"must be between {MIN_PREFIX_BYTES} and {MAX_PREFIX_BYTES}"
+        )
+    return number
+
+
+def read_records(path: str, fmt: str, prefix_bytes: int):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            record = parse_dump_line(line, fmt, prefix_bytes)
+            if record is not None:
+                yield record
+
+
+if __name__ == "__main__":
+    start_logging()
+    parser = argparse.ArgumentParser(
+        description="Build the offline breached password index from a local dump."
+    )
+    parser.add_argument(
+        "dump", help="Dump with one SHA-1 hex digest or clear password per line."
+    )
+    parser.add_argument("output", help="Index file to write, e.g. breached.idx.")
+    parser.add_argument(
+        "--format",
+        choices=["sha1", "plain"],
+        default="sha1",
+        help="Dump line format. Defaults to sha1.",
+    )
+    parser.add_argument(
+        "--prefix-bytes",
+        type=prefix_bytes,
+        default=8,
+        help=(
+            f"Bytes of each SHA-1 kept, {MIN_PREFIX_BYTES} to {MAX_PREFIX_BYTES}. "
+            "Defaults to 8."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=5_000_000,
+        help="Records sorted in memory at once. Defaults to 5000000.",
+    )
+    parser.add_argument(
+        "--bloom-error-rate",
+        type=float,
+        default=None,
+        help="Also write a Bloom pre-filter with this false positive rate.",
+    )
+    args = parser.parse_args()
+
+    count = build_index(
+        read_records(args.dump, args.format, args.prefix_bytes),
+        args.output,
+        prefix_bytes=args.prefix_bytes,
+        chunk_size=args.chunk_size,
+        bloom_error_rate=args.bloom_error_rate,
+    )
+    logger.info(f" Breached password index written: {count} entries.")
@@ -0,0 +1,78 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+
+from passlib.hash import argon2, bcrypt
+
+SAMPLE_PASSWORD = "Calibrate123$"
+
+
+def measure(handler, samples: int) -> float:
+    """Median time, in milliseconds, to hash one password with ``handler``."""
+    # The first call also loads the backend, keep it out of the timings.
+    handler.hash(SAMPLE_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> int:
+    recommended = 4
+    for rounds in range(4, 32):
+        elapsed = measure(bcrypt.using(rounds=rounds), samples)
+        print(f"bcrypt rounds={rounds:<2} {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        recommended = rounds
+    print(f"\nRecommended: BCRYPT_ROUNDS={recommended}")
+    return recommended
+
+
+def calibrate_argon2(target_ms: float, samples: int, memory_cost: int) -> int:
+    recommended = 1
+    for time_cost in range(1, 33):
+        elapsed = measure(
+            argon2.using(time_cost=time_cost, memory_cost=memory_cost), samples
+        )
+        print(f"argon2 time_cost={time_cost:<2} {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        recommended = time_cost
+    print(
+        f"\nRecommended: ARGON2_TIME_COST={recommended} "
+        f"ARGON2_MEMORY_COST={memory_cost}"
+    )
+    return recommended
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Find the highest hashing cost that meets a latency target "
+        "on this machine."
+    )
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt")
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250.0,
+        help="Maximum time to hash one password, in milliseconds.",
+    )
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument(
+        "--memory-cost", type=int, default=65536, help="argon2 memory in KiB."
+    )
+    args = parser.parse_args()
+
+    if args.scheme == "argon2":
+        calibrate_argon2(args.target_ms, args.samples, args.memory_cost)
+    else:
+        calibrate_bcrypt(args.target_ms, args.samples)
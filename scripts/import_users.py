@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+
+from common.config import settings
+from common.logger_config import logger, start_logging
+from db.engine import AsyncSessionLocal, engine
+from users.bulk_import import import_users, parse_records
+from users.hashing import password_hasher
+
+
+async def read_lines(path: str):
+    with open(path, "rb") as f:
+        for line in f:
+            yield line
+
+
+async def main(path: str, fmt: str, batch_size: int):
+    created = failed = 0
+    async with AsyncSessionLocal() as session:
+        records = parse_records(read_lines(path), fmt)
+        async for result in import_users(records, session, batch_size=batch_size):
+            print(json.dumps(result), flush=True)
+            if result["status"] == "created":
+                created += 1
+            else:
+                failed += 1
+
+    password_hasher.shutdown()
+    await engine.dispose()
+    logger.info(f" Import complete: {created} created, {failed} failed.")
+
+
+if __name__ == "__main__":
+    start_logging()
+    parser = argparse.ArgumentParser(
+        description="Import users from a JSON Lines or CSV file."
+    )
+    parser.add_argument("path", help="File with one user per line.")
+    parser.add_argument(
+        "--format",
+        choices=["jsonl", "csv"],
+        help="Input format. Defaults to the file extension.",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.BULK_IMPORT_BATCH_SIZE
+    )
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+    asyncio.run(main(args.path, fmt, args.batch_size))
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+
+from common.logger_config import logger, start_logging
+from db.engine import AsyncSessionLocal, engine
+from db.migrations import (
+    SCHEMA_VERSION,
+    backfill_normalized,
+    get_schema_version,
+    migrate,
+)
+from db.schemas import Base
+from users.hashing import password_hasher
+from users.services import create_initial_admin_user
+
+
+async def reset():
+    logger.info(" Dropping all tables...")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await migrate(engine)
+    logger.info(" Database reset complete.")
+
+
+async def seed_admin():
+    async with AsyncSessionLocal() as session:
+        await create_initial_admin_user(session)
+
+
+async def bootstrap():
+    await migrate(engine)
+    await seed_admin()
+
+
+async def version():
+    current = await get_schema_version(engine)
+    logger.info(f" Schema version {current}, code expects {SCHEMA_VERSION}.")
+
+
+COMMANDS = {
+    "migrate": lambda: migrate(engine),
+    "reset": reset,
+    "seed-admin": seed_admin,
+    "bootstrap": bootstrap,
+    "version": version,
+    "backfill-normalized": lambda: backfill_normalized(engine),
+}
+
+
+async def run(command: str):
+    try:
+        await COMMANDS[command]()
+    finally:
+        password_hasher.shutdown()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    start_logging()
+    parser = argparse.ArgumentParser(description="Manage the database schema.")
+    parser.add_argument(
+        "command",
+        choices=COMMANDS,
+        help="migrate: create or upgrade the schema; reset: drop everything and "
+        "migrate; seed-admin: create the first superuser; bootstrap: migrate "
+        "and seed-admin; version: show the schema version; backfill-normalized: "
+        "fill the case-insensitive username and email columns in batches.",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.command))
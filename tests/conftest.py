@@ -0,0 +1,2 @@
+# Makes the shared ``client`` fixture available to every test module.
+pytest_plugins = ["tests.testing_db"]
@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from common.admission import (
+    AdmissionControlMiddleware,
+    AdmissionController,
+    AdmissionLimit,
+)
+
+
+def test_limit_queues_briefly_then_sheds():
+    limit = AdmissionLimit(max_concurrency=1, max_queue=1, max_wait=0.05)
+
+    async def scenario():
+        assert await limit.acquire()
+        # One waiter fits in the queue, the next one is shed at once.
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        assert not await limit.acquire()
+
+        limit.release()
+        assert await waiter
+        # Nobody releases now: the queued request gives up after max_wait.
+        assert not await limit.acquire()
+        limit.release()
+        return limit.stats()
+
+    assert asyncio.run(scenario()) == {
+        "in_flight": 0, "queued": 0, "admitted": 2, "shed": 2
+    }
+
+
+def test_middleware_sheds_limited_routes_only():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.post("/login")
+    async def login():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    controller = AdmissionController({"POST /login": 2}, max_queue=0, max_wait=0.05)
+    app.add_middleware(AdmissionControlMiddleware, controller=controller)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            busy = [asyncio.create_task(client.post("/login")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+
+            shed = await client.post("/login")
+            health_resp = await client.get("/health")
+            release.set()
+            return shed, health_resp, await asyncio.gather(*busy)
+
+    shed, health_resp, busy = asyncio.run(scenario())
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert health_resp.status_code == 200
+    assert [response.status_code for response in busy] == [200, 200]
+    assert controller.stats()["post_login_shed"] == 1
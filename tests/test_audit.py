@@ -0,0 +1,155 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from db.schemas import AuthEventsDB, UsersDB
+from tests.testing_db import (
+    FIRST_SUPERUSER_PASSWORD,
+    FIRST_SUPERUSER_USERNAME,
+    TestingSessionLocal,
+)
+from users.audit import AuditLog, audit_log
+
+
+def _login(client: TestClient, password: str):
+    return client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME, "password": password
+    }, headers={"User-Agent": "audit-test"})
+
+
+def test_auth_events_are_written_in_batches(client: TestClient):
+    asyncio.run(audit_log.flush(TestingSessionLocal))
+    written = audit_log.written
+
+    _login(client, "Wrongpass123$")
+    for _ in range(3):
+        _login(client, FIRST_SUPERUSER_PASSWORD)
+    assert len(audit_log) == 4
+
+    async def check():
+        assert await audit_log.flush(TestingSessionLocal) == 4
+        async with TestingSessionLocal() as session:
+            outcomes = (
+                await session.execute(
+                    select(AuthEventsDB.outcome, func.count())
+                    .where(AuthEventsDB.username == FIRST_SUPERUSER_USERNAME)
+                    .group_by(AuthEventsDB.outcome)
+                )
+            ).all()
+            user_agents = (
+                await session.execute(select(AuthEventsDB.user_agent).distinct())
+            ).scalars().all()
+            last_login_at = (
+                await session.execute(
+                    select(UsersDB.last_login_at).where(
+                        UsersDB.username == FIRST_SUPERUSER_USERNAME
+                    )
+                )
+            ).scalar_one()
+        return dict(outcomes), user_agents, last_login_at
+
+    outcomes, user_agents, last_login_at = asyncio.run(check())
+    assert outcomes["success"] >= 3 and outcomes["invalid_credentials"] >= 1
+    assert "audit-test" in user_agents
+    assert last_login_at is not None
+    assert audit_log.written == written + 4
+
+
+def test_refresh_events_carry_the_user_id(client: TestClient):
+    refresh_token = _login(client, FIRST_SUPERUSER_PASSWORD).json()["refresh_token"]
+    response = client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+
+    async def check():
+        await audit_log.flush(TestingSessionLocal)
+        async with TestingSessionLocal() as session:
+            user_id = (
+                await session.execute(
+                    select(UsersDB.id).where(
+                        UsersDB.username == FIRST_SUPERUSER_USERNAME
+                    )
+                )
+            ).scalar_one()
+            refresh_user_ids = (
+                await session.execute(
+                    select(AuthEventsDB.user_id).where(
+                        AuthEventsDB.event == "refresh",
+                        AuthEventsDB.outcome == "success",
+                    )
+                )
+            ).scalars().all()
+        return user_id, refresh_user_ids
+
+    user_id, refresh_user_ids = asyncio.run(check())
+    assert refresh_user_ids and set(refresh_user_ids) == {user_id}
+
+
+def test_rejected_batch_is_retried_one_event_at_a_time(client: TestClient):
+    log = AuditLog(batch_size=10)
+    log.record("login", "success", username="x" * 1000)
+    log.record("login", None, username="broken")
+    log.record("login", "invalid_credentials", username="someone")
+
+    async def scenario():
+        written = await log.flush(TestingSessionLocal)
+        async with TestingSessionLocal() as session:
+            usernames = (
+                await session.execute(
+                    select(AuthEventsDB.username).where(
+                        AuthEventsDB.username.in_(["x" * 255, "broken", "someone"])
+                    )
+                )
+            ).scalars().all()
+        return written, usernames
+
+    written, usernames = asyncio.run(scenario())
+    assert written == 2 and log.failed == 1
+    assert sorted(usernames) == ["someone", "x" * 255]
+
+
+def test_unreachable_database_requeues_instead_of_retrying_each_event():
+    attempts = []
+
+    class DownSession:
+        async def __aenter__(self):
+            attempts.append(1)
+            raise OperationalError("INSERT", {}, ConnectionError("database is down"))
+
+        async def __aexit__(self, *exc):
+            return False
+
+    log = AuditLog(batch_size=10, flush_interval=1)
+    for _ in range(25):
+        log.record("login", "success", username="someone")
+
+    assert asyncio.run(log.flush(DownSession)) == 0
+    assert len(attempts) == 1
+    assert len(log) == 25 and log.failed == 0
+    assert log.backoff == 1
+
+    asyncio.run(log.flush(DownSession))
+    assert len(attempts) == 2 and log.backoff == 2
+
+    assert asyncio.run(log.flush(TestingSessionLocal)) == 25
+    assert len(log) == 0 and log.backoff == 0
+
+
+def test_full_queue_drops_events_and_run_drains_on_cancel():
+    log = AuditLog(max_size=2, batch_size=10, flush_interval=60)
+    for _ in range(3):
+        log.record("login", "success", username="someone", user_id=None)
+    assert log.dropped == 1
+
+    async def scenario():
+        task = asyncio.create_task(log.run(TestingSessionLocal))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    assert len(log) == 0 and log.written == 2
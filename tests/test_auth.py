@@ -1,5 +1,29 @@
+import asyncio
+import json
+
 from fastapi.testclient import TestClient
-from tests.testing_db import client
+from passlib.hash import bcrypt
+from sqlalchemy import event, select
+
+from common.config import settings
+from db.exceptions import DatabaseConnectionError
+from db.schemas import UsersDB
+from common.cache import SQLiteCacheBackend
+from db.querys import (
+    deactivate_user_query,
+    get_user,
+    password_hashes,
+    user_cache,
+    user_lookups,
+)
+from models.models import UserRecord
+from tests.testing_db import TestingSessionLocal, engine_test
+from users.services import (
+    create_access_token,
+    decode_access_token,
+    purge_token_cache,
+    token_cache,
+)
 from tests.testing_db import FIRST_SUPERUSER_USERNAME, FIRST_SUPERUSER_PASSWORD   
 
 
@@ -57,3 +81,482 @@ def test_login_fail_wrong_password(client: TestClient):
         "password": "wrongpass"
     })
     assert response.status_code == 401
+
+
+def test_users_me_is_served_from_user_cache(client: TestClient):
+    login = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    })
+    token = login.json()["access_token"]
+
+    hits = user_cache.hits
+    response = client.get("/users/me", headers={
+        "Authorization": f"Bearer {token}"
+    })
+    assert response.status_code == 200
+    assert user_cache.hits == hits + 1
+
+
+def test_token_cache_skips_decode_and_can_be_purged():
+    token = create_access_token(data={"sub": "cached"})
+
+    assert decode_access_token(token)["sub"] == "cached"
+    hits = token_cache.hits
+    assert decode_access_token(token)["sub"] == "cached"
+    assert token_cache.hits == hits + 1
+
+    purge_token_cache(token)
+    misses = token_cache.misses
+    decode_access_token(token)
+    assert token_cache.misses == misses + 1
+
+
+def test_stateless_users_me_is_revoked_on_deactivation(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    client.post("/users", json={
+        "username": "stateless",
+        "email": "stateless@example.com",
+        "password": "Stateless123$"
+    })
+    login = client.post("/login", data={
+        "username": "stateless",
+        "password": "Stateless123$"
+    })
+    token = login.json()["access_token"]
+
+    response = client.get("/users/me", headers={
+        "Authorization": f"Bearer {token}"
+    })
+    assert response.status_code == 200
+    assert response.json()["email"] == "stateless@example.com"
+    assert "password" not in response.json()
+
+    async def deactivate():
+        async with TestingSessionLocal() as session:
+            return await deactivate_user_query("stateless", session)
+
+    assert asyncio.run(deactivate())
+
+    response = client.get("/users/me", headers={
+        "Authorization": f"Bearer {token}"
+    })
+    assert response.status_code == 401
+
+
+def test_stateless_auth_reports_database_errors_as_unavailable(
+    client: TestClient, monkeypatch
+):
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    token = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    }).json()["access_token"]
+
+    async def unreachable(user_id, db):
+        raise DatabaseConnectionError()
+
+    monkeypatch.setattr("users.services.get_token_version", unreachable)
+    response = client.get("/users/me", headers={
+        "Authorization": f"Bearer {token}"
+    })
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Database connection error"
+
+
+def test_bulk_import_reports_each_row(client: TestClient):
+    login = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    })
+    token = login.json()["access_token"]
+
+    body = "\n".join([
+        "username,email,password",
+        "bulk_one,bulk_one@example.com,Bulkpass123$",
+        "bulk_two,bulk_two@example.com,weak",
+        "bulk_one,bulk_three@example.com,Bulkpass123$",
+        f"{FIRST_SUPERUSER_USERNAME},other@example.com,Bulkpass123$",
+    ])
+    response = client.post("/users/bulk", headers={
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "text/csv",
+    }, content=body)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["status"] for row in rows] == [
+        "created", "invalid", "duplicate", "duplicate"
+    ]
+
+    login = client.post("/login", data={
+        "username": "bulk_one",
+        "password": "Bulkpass123$"
+    })
+    assert login.status_code == 200
+
+
+def test_bulk_import_reports_undecodable_lines_as_invalid(client: TestClient):
+    token = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    }).json()["access_token"]
+
+    body = b"\n".join([
+        json.dumps({
+            "username": "bulk_latin1",
+            "email": "bulk_latin1@example.com",
+            "password": "Bulkpass123$",
+        }).encode().replace(b"latin1", b"latin\xff"),
+        json.dumps({
+            "username": "bulk_utf8",
+            "email": "bulk_utf8@example.com",
+            "password": "Bulkpass123$",
+        }).encode(),
+    ])
+    response = client.post("/users/bulk", headers={
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/x-ndjson",
+    }, content=body)
+
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["line"], row["status"]) for row in rows] == [
+        (1, "invalid"), (2, "created")
+    ]
+    assert rows[0]["detail"].startswith("Invalid UTF-8")
+
+
+def test_bulk_import_is_reserved_to_the_superuser(client: TestClient):
+    client.post("/users/", json={
+        "username": "bulk_outsider",
+        "email": "bulk_outsider@example.com",
+        "password": "Outsider123$"
+    })
+    token = client.post("/login", data={
+        "username": "bulk_outsider",
+        "password": "Outsider123$"
+    }).json()["access_token"]
+
+    response = client.post("/users/bulk", headers={
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "text/csv",
+    }, content="username,email,password\nsneaky,sneaky@example.com,Sneaky123$")
+    assert response.status_code == 403
+
+
+def test_list_users_keyset_pages_and_ndjson_stream(client: TestClient):
+    login = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    })
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    first = client.get("/users", headers=headers, params={
+        "limit": 1, "fields": "username"
+    })
+    assert first.status_code == 200
+    page = first.json()
+    assert list(page["items"][0]) == ["id", "username"]
+    assert page["next_after"] == page["items"][0]["id"]
+
+    second = client.get("/users", headers=headers, params={
+        "limit": 1, "after": page["next_after"]
+    })
+    assert second.json()["items"][0]["id"] > page["next_after"]
+
+    stream = client.get("/users", headers=headers, params={"format": "ndjson"})
+    assert stream.status_code == 200
+    lines = stream.text.splitlines()
+    assert len(lines) > 1
+    assert all("password" not in line for line in lines)
+
+    response = client.get("/users", headers=headers, params={"fields": "password"})
+    assert response.status_code == 400
+
+
+def test_list_users_is_reserved_to_the_superuser(client: TestClient):
+    client.post("/users/", json={
+        "username": "list_outsider",
+        "email": "list_outsider@example.com",
+        "password": "Outsider123$"
+    })
+    token = client.post("/login", data={
+        "username": "list_outsider",
+        "password": "Outsider123$"
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/users", headers=headers).status_code == 403
+    response = client.get("/users", headers=headers, params={"format": "ndjson"})
+    assert response.status_code == 403
+
+
+def test_login_is_throttled_per_username(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_PER_USER", 2)
+
+    for _ in range(2):
+        response = client.post("/login", data={
+            "username": "throttled",
+            "password": "wrongpass"
+        })
+        assert response.status_code != 429
+
+    response = client.post("/login", data={
+        "username": "throttled",
+        "password": "wrongpass"
+    })
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_metrics_exposes_route_and_stage_histograms(client: TestClient):
+    client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    })
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{route="/login",method="POST",status="200"}'
+        in body
+    )
+    assert 'auth_stage_duration_seconds_count{stage="verify_and_update"}' in body
+    assert 'auth_stage_duration_seconds_count{stage="jwt_encode"}' in body
+    assert "password_hasher_queue_depth" in body
+
+
+def test_outdated_hash_is_upgraded_after_login(client: TestClient):
+    async def create_outdated_user():
+        async with TestingSessionLocal() as session:
+            session.add(UsersDB(
+                username="outdated",
+                email="outdated@example.com",
+                password=bcrypt.using(rounds=5).hash("Outdated123$"),
+                is_active=True,
+            ))
+            await session.commit()
+
+    async def stored_hash():
+        async with TestingSessionLocal() as session:
+            result = await session.execute(
+                select(UsersDB.password).where(UsersDB.username == "outdated")
+            )
+            return result.scalar_one()
+
+    asyncio.run(create_outdated_user())
+    login = client.post("/login", data={
+        "username": "outdated",
+        "password": "Outdated123$"
+    })
+    assert login.status_code == 200
+
+    new_hash = asyncio.run(stored_hash())
+    assert new_hash.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert bcrypt.verify("Outdated123$", new_hash)
+
+
+def test_create_user_conflict_names_the_clashing_field(client: TestClient):
+    response = client.post("/users", json={
+        "username": "conflict",
+        "email": "conflict@example.com",
+        "password": "Conflict123$"
+    })
+    assert response.status_code == 200
+    assert "password" not in response.json()
+    assert response.json()["id"] is not None
+
+    response = client.post("/users", json={
+        "username": "conflict_two",
+        "email": "conflict@example.com",
+        "password": "Conflict123$"
+    })
+    assert response.status_code == 409
+    assert response.json()["detail"] == ["Email already exists"]
+
+    response = client.post("/users", json={
+        "username": "conflict",
+        "email": "conflict_two@example.com",
+        "password": "Conflict123$"
+    })
+    assert response.status_code == 409
+    assert response.json()["detail"] == ["Username already exists"]
+
+
+def test_refresh_token_rotation_and_reuse_detection(client: TestClient):
+    login = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    })
+    first_refresh = login.json()["refresh_token"]
+    assert first_refresh
+
+    refreshed = client.post("/token/refresh", json={"refresh_token": first_refresh})
+    assert refreshed.status_code == 200
+    second_refresh = refreshed.json()["refresh_token"]
+    assert second_refresh != first_refresh
+
+    response = client.get("/users/me", headers={
+        "Authorization": f"Bearer {refreshed.json()['access_token']}"
+    })
+    assert response.status_code == 200
+
+    # Reusing the rotated token revokes the whole session family.
+    reused = client.post("/token/refresh", json={"refresh_token": first_refresh})
+    assert reused.status_code == 401
+    revoked = client.post("/token/refresh", json={"refresh_token": second_refresh})
+    assert revoked.status_code == 401
+
+
+def test_introspect_resolves_many_tokens_with_few_queries(client: TestClient):
+    admin_token = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    }).json()["access_token"]
+    client.post("/users", json={
+        "username": "introspected",
+        "email": "introspected@example.com",
+        "password": "Introspect123$"
+    })
+    revoked = create_access_token(data={"sub": "introspected"})
+    client.post(
+        "/tokens/revoke",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json={"token": revoked},
+    )
+    same_tokens = [create_access_token(data={"sub": "introspected"})] * 200
+    tokens = same_tokens + [
+        create_access_token(data={"sub": FIRST_SUPERUSER_USERNAME}),
+        create_access_token(data={"sub": "ghost"}),
+        "not-a-token",
+        revoked,
+    ]
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = client.post(
+            "/tokens/introspect",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={"tokens": tokens},
+        )
+    finally:
+        event.remove(engine_test.sync_engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["active"] for result in results[-4:]] == [
+        True, False, False, False
+    ]
+    assert all(result["sub"] == "introspected" for result in results[:200])
+    # At most the admin lookup, one users IN query and one denylist query.
+    assert len(statements) <= 3
+
+
+def test_shared_user_cache_never_stores_the_password_hash(
+    client: TestClient, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(
+        user_cache, "backend", SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    )
+
+    async def load():
+        async with TestingSessionLocal() as session:
+            await user_cache.clear()
+            password_hashes.clear()
+            first = await get_user(FIRST_SUPERUSER_USERNAME, session)
+            prefix = await user_cache._prefix()
+            key = f"{prefix}{FIRST_SUPERUSER_USERNAME.lower()}"
+            [stored] = await user_cache.backend.get_many([key])
+            cached = await get_user(FIRST_SUPERUSER_USERNAME, session)
+            password_hashes.clear()
+            reloaded = await get_user(FIRST_SUPERUSER_USERNAME, session)
+            return first, stored, cached, reloaded
+
+    first, stored, cached, reloaded = asyncio.run(load())
+    assert first.password.startswith("$2")
+    assert json.loads(stored)["password"] is None
+    assert first.password not in str(stored)
+    assert cached.password == first.password
+    assert reloaded.password == first.password
+
+
+def test_get_user_returns_a_read_model_without_validation(client: TestClient):
+    async def load():
+        async with TestingSessionLocal() as session:
+            await user_cache.clear()
+            return await get_user(FIRST_SUPERUSER_USERNAME, session)
+
+    user = asyncio.run(load())
+    assert isinstance(user, UserRecord)
+    assert user.password.startswith("$2")
+
+    token = client.post("/login", data={
+        "username": FIRST_SUPERUSER_USERNAME,
+        "password": FIRST_SUPERUSER_PASSWORD
+    }).json()["access_token"]
+    response = client.get("/users/me/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert "password" not in response.json()
+
+
+def test_concurrent_user_lookups_share_one_query(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", False)
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async def herd():
+        async with TestingSessionLocal() as session:
+            return await asyncio.gather(
+                *(get_user(FIRST_SUPERUSER_USERNAME, session) for _ in range(20))
+            )
+
+    coalesced = user_lookups.coalesced
+    event.listen(engine_test.sync_engine, "before_cursor_execute", listener)
+    try:
+        users = asyncio.run(herd())
+    finally:
+        event.remove(engine_test.sync_engine, "before_cursor_execute", listener)
+
+    assert len({id(user) for user in users}) == 1
+    assert len(statements) == 1
+    assert user_lookups.coalesced == coalesced + 19
+
+
+def test_usernames_and_emails_are_case_insensitive(client: TestClient):
+    response = client.post("/users/", json={
+        "username": "CaseUser",
+        "email": "Case.User@Example.com",
+        "password": "Caseuser123$"
+    })
+    assert response.status_code == 200
+
+    response = client.post("/users/", json={
+        "username": "caseuser",
+        "email": "another@example.com",
+        "password": "Caseuser123$"
+    })
+    assert response.status_code == 409
+    assert response.json()["detail"] == ["Username already exists"]
+
+    response = client.post("/users/", json={
+        "username": "another_case",
+        "email": "case.user@example.COM",
+        "password": "Caseuser123$"
+    })
+    assert response.status_code == 409
+    assert response.json()["detail"] == ["Email already exists"]
+
+    response = client.post("/login", data={
+        "username": "CASEUSER", "password": "Caseuser123$"
+    })
+    assert response.status_code == 200
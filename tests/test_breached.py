@@ -0,0 +1,89 @@
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from common.config import settings
+from users.breached import (
+    BreachedPasswordIndex,
+    build_index,
+    get_breached_index,
+    parse_dump_line,
+    password_key,
+)
+
+BREACHED = ["Password123!", "Qwerty123$", "Letmein1!"] + [
+    f"Leaked{i}pw!" for i in range(500)
+]
+
+
+def _build(tmp_path, bloom_error_rate=None) -> str:
+    path = str(tmp_path / "breached.idx")
+    # A tiny chunk size exercises the external merge and deduplication.
+    records = [password_key(password) for password in BREACHED * 2]
+    count = build_index(
+        records, path, chunk_size=64, bloom_error_rate=bloom_error_rate
+    )
+    assert count == len(BREACHED)
+    return path
+
+
+@pytest.mark.parametrize("bloom_error_rate", [None, 0.01])
+def test_index_finds_every_breached_password(tmp_path, bloom_error_rate):
+    index = BreachedPasswordIndex(_build(tmp_path, bloom_error_rate), use_bloom=True)
+    try:
+        assert (index.bloom is not None) == (bloom_error_rate is not None)
+        assert all(password in index for password in BREACHED)
+        assert "Unbreached123$" not in index
+        assert not any(f"Fresh{i}pw!" in index for i in range(500))
+    finally:
+        index.close()
+
+
+def test_rebuild_without_bloom_removes_the_stale_filter(tmp_path):
+    path = _build(tmp_path, bloom_error_rate=0.01)
+    assert (tmp_path / "breached.idx.bloom").exists()
+
+    _build(tmp_path)
+
+    assert not (tmp_path / "breached.idx.bloom").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["breached.idx"]
+    index = BreachedPasswordIndex(path, use_bloom=True)
+    try:
+        assert index.bloom is None
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize("prefix_bytes", [0, 1, 21])
+def test_build_index_rejects_unsupported_prefix_widths(tmp_path, prefix_bytes):
+    with pytest.raises(ValueError):
+        build_index([], str(tmp_path / "breached.idx"), prefix_bytes=prefix_bytes)
+
+
+def test_sha1_dump_lines_match_plain_passwords():
+    line = hashlib.sha1(b"Password123!").hexdigest().upper() + ":42\n"
+    assert parse_dump_line(line, "sha1", 8) == password_key("Password123!")
+    assert parse_dump_line("not a digest", "sha1", 8) is None
+
+
+def test_signup_rejects_breached_password(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BREACHED_PASSWORDS_FILE", _build(tmp_path))
+    get_breached_index.cache_clear()
+    try:
+        response = client.post("/users/", json={
+            "username": "breached",
+            "email": "breached@example.com",
+            "password": "Password123!",
+        })
+        assert response.status_code == 400
+
+        response = client.post("/users/", json={
+            "username": "breached",
+            "email": "breached@example.com",
+            "password": "Unbreached123$",
+        })
+        assert response.status_code == 200
+    finally:
+        get_breached_index().close()
+        get_breached_index.cache_clear()
@@ -0,0 +1,172 @@
+import asyncio
+import socketserver
+import threading
+import time
+
+import pytest
+
+from common.cache import (
+    Cache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SingleFlight,
+    SQLiteCacheBackend,
+    _encode_command,
+    _read_reply,
+)
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Just enough of a Redis server for the commands the backend sends."""
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            try:
+                command = _read_reply(self.rfile)
+            except Exception:
+                return
+            name, args = command[0].upper(), command[1:]
+            if name == b"GET":
+                reply = self._get(args[0])
+            elif name == b"MGET":
+                reply = [self._get(key) for key in args]
+            elif name == b"SET":
+                expires_at = time.time() + int(args[3]) / 1000
+                data[args[0]] = (args[1], expires_at)
+                reply = "OK"
+            elif name == b"DEL":
+                reply = sum(data.pop(key, None) is not None for key in args)
+            elif name == b"INCR":
+                value = int(self._get(args[0]) or 0) + 1
+                data[args[0]] = (str(value).encode(), float("inf"))
+                reply = value
+            self.wfile.write(self._encode(reply))
+
+    def _get(self, key):
+        value, expires_at = self.server.data.get(key, (None, 0))
+        return value if expires_at > time.time() else None
+
+    def _encode(self, reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, list):
+            return f"*{len(reply)}\r\n".encode() + b"".join(map(self._encode, reply))
+        return _encode_command(reply)[4:]
+
+
+@pytest.fixture
+def redis_url():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RespHandler)
+    server.daemon_threads = True
+    server.data = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+def _backends(tmp_path, redis_url):
+    return {
+        "sqlite": lambda: SQLiteCacheBackend(str(tmp_path / "cache.db")),
+        "redis": lambda: RedisCacheBackend(redis_url),
+    }
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "redis"])
+def test_shared_backends_are_consistent_across_workers(kind, tmp_path, redis_url):
+    make_backend = _backends(tmp_path, redis_url)[kind]
+
+    async def scenario():
+        # Two caches on separate backends stand for two workers.
+        first = Cache(make_backend(), "user", version_check_interval=0)
+        second = Cache(make_backend(), "user", version_check_interval=0)
+
+        await first.set("alice", {"id": 1})
+        await first.set("bob", {"id": 2}, ttl=0.001)
+        await asyncio.sleep(0.01)
+        assert await second.get_many(["alice", "bob", "carol"]) == {
+            "alice": {"id": 1}
+        }
+
+        await second.delete("alice")
+        assert await first.get("alice") is None
+
+        await first.set("alice", {"id": 1})
+        await second.clear()
+        assert await first.get("alice") is None
+
+    asyncio.run(scenario())
+
+
+def test_memory_backend_keeps_objects_and_clears():
+    async def scenario():
+        cache = Cache(MemoryCacheBackend(max_size=2), "user")
+        value = object()
+        await cache.set("alice", value)
+        assert await cache.get("alice") is value
+
+        await cache.clear()
+        assert await cache.get("alice") is None
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_backend_is_a_miss():
+    async def scenario():
+        cache = Cache(RedisCacheBackend("redis://127.0.0.1:1/0"), "user")
+        await cache.set("alice", {"id": 1})
+        assert await cache.get("alice") is None
+        assert cache.errors == 2
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_shares_one_call_and_its_exception():
+    flight = SingleFlight()
+    calls = []
+
+    async def lookup(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        if key == "missing":
+            raise KeyError(key)
+        return key.upper()
+
+    async def scenario():
+        found = await asyncio.gather(*(flight.do("a", lookup, "a") for _ in range(20)))
+        missing = await asyncio.gather(
+            *(flight.do("missing", lookup, "missing") for _ in range(5)),
+            return_exceptions=True,
+        )
+        return found, missing
+
+    found, missing = asyncio.run(scenario())
+    assert found == ["A"] * 20
+    assert all(isinstance(error, KeyError) for error in missing)
+    assert calls == ["a", "missing"]
+    assert flight.stats() == {"calls": 2, "coalesced": 23, "in_flight": 0}
+
+
+def test_single_flight_waiters_retry_when_the_leader_is_cancelled():
+    flight = SingleFlight()
+
+    async def lookup():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("a", lookup))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("a", lookup))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,75 @@
+import asyncio
+import itertools
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import db.engine
+from db.access import get_read_db, get_read_sessionmaker
+from db.engine import TimedQueuePool, pool_stats
+
+
+def _pooled_engine(path):
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        poolclass=TimedQueuePool,
+        pool_size=2,
+        max_overflow=1,
+    )
+
+
+def test_timed_queue_pool_counts_checkouts_and_waits(tmp_path):
+    async def scenario():
+        engine = _pooled_engine(tmp_path / "pool.db")
+        try:
+            for _ in range(3):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            return engine.sync_engine.pool.metrics, pool_stats(engine)
+        finally:
+            await engine.dispose()
+
+    metrics, stats = asyncio.run(scenario())
+    assert metrics.checkouts == 3
+    assert metrics.checkins == 3
+    assert metrics.wait_seconds_max >= 0
+    assert stats["checkouts"] == 3
+    assert stats["checked_out"] == 0
+    assert stats["size"] == 2
+    assert stats["max_overflow"] == 1
+
+
+def test_pool_stats_on_unsized_pool_reports_status_only():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            return pool_stats(engine)
+        finally:
+            await engine.dispose()
+
+    assert list(asyncio.run(scenario())) == ["status"]
+
+
+def test_read_sessions_round_robin_over_replicas(tmp_path, monkeypatch):
+    async def scenario():
+        engines = [_pooled_engine(tmp_path / f"replica{i}.db") for i in range(2)]
+        makers = [
+            sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+            for engine in engines
+        ]
+        monkeypatch.setattr(db.engine, "_read_sessionmakers", itertools.cycle(makers))
+        try:
+            binds = []
+            for _ in range(3):
+                async for session in get_read_db():
+                    binds.append(session.bind)
+            factories = [get_read_sessionmaker() for _ in range(2)]
+            return engines, makers, binds, factories
+        finally:
+            for engine in engines:
+                await engine.dispose()
+
+    engines, makers, binds, factories = asyncio.run(scenario())
+    assert binds == [engines[0], engines[1], engines[0]]
+    assert factories == [makers[1], makers[0]]
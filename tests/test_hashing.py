@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from users.exceptions import ServiceUnavailableException
+from users.hashing import PasswordHasher
+
+
+def test_hash_and_verify_in_worker_pool():
+    hasher = PasswordHasher(max_workers=2)
+
+    async def run():
+        hashed = await hasher.hash_password("Secret123$")
+        results = await asyncio.gather(
+            hasher.verify_password("Secret123$", hashed),
+            hasher.verify_password("wrong", hashed),
+        )
+        return hashed, results
+
+    try:
+        hashed, results = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+    assert hashed != "Secret123$"
+    assert results == [True, False]
+    assert hasher.stats()["completed"] == 3
+    assert hasher.stats()["queue_depth"] == 0
+
+
+def test_full_queue_is_rejected():
+    hasher = PasswordHasher(max_workers=1, max_pending=1, queue_timeout=1e-6)
+
+    async def run():
+        return await asyncio.gather(
+            hasher.hash_password("Secret123$"),
+            hasher.hash_password("Secret123$"),
+        )
+
+    try:
+        with pytest.raises(ServiceUnavailableException):
+            asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+    assert hasher.stats()["rejected"] == 1
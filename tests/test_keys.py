@@ -0,0 +1,99 @@
+import threading
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("cryptography")
+
+from tests.testing_db import FIRST_SUPERUSER_PASSWORD, FIRST_SUPERUSER_USERNAME
+from common.config import settings
+from users.keys import KeyStore, key_store
+from users.services import purge_token_cache
+
+DAY = 86400.0
+
+
+def _store(tmp_path, algorithm="RS256") -> KeyStore:
+    return KeyStore(
+        str(tmp_path), algorithm, rotation=30 * DAY, overlap=DAY, activation_delay=3600
+    )
+
+
+def test_rotation_keeps_old_key_published_during_overlap(tmp_path):
+    store = _store(tmp_path, "EdDSA")
+    now = 1_000_000.0
+    store.rotate(now)
+    first = store.signing_key(now).kid
+
+    # Due for rotation: the new key is published but does not sign yet.
+    now += 30 * DAY
+    store.rotate(now)
+    assert len(store.jwks()["keys"]) == 2
+    assert store.signing_key(now).kid == first
+
+    now += 3600
+    assert store.signing_key(now).kid != first
+
+    # Past the overlap window the old key is retired.
+    now += DAY + 1
+    store.rotate(now)
+    kids = [key["kid"] for key in store.jwks()["keys"]]
+    assert len(kids) == 1 and first not in kids
+
+
+def test_concurrent_workers_generate_a_single_key(tmp_path):
+    stores = [_store(tmp_path, "EdDSA") for _ in range(4)]
+    barrier = threading.Barrier(len(stores))
+
+    def rotate(store):
+        barrier.wait()
+        store.rotate()
+
+    threads = [threading.Thread(target=rotate, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(list(tmp_path.glob("*.pem"))) == 1
+    assert len({store.signing_key().kid for store in stores}) == 1
+
+
+def test_new_keys_wait_for_every_worker_and_jwks_cache():
+    assert key_store.activation_delay >= (
+        settings.JWKS_MAX_AGE_SECONDS + settings.JWT_KEY_CHECK_INTERVAL_SECONDS
+    )
+
+
+def test_rs256_tokens_verify_against_the_jwks(
+    client: TestClient, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(key_store, "directory", str(tmp_path))
+    monkeypatch.setattr(key_store, "algorithm", "RS256")
+    key_store.reset()
+    purge_token_cache()
+    try:
+        token = client.post("/login", data={
+            "username": FIRST_SUPERUSER_USERNAME,
+            "password": FIRST_SUPERUSER_PASSWORD,
+        }).json()["access_token"]
+
+        response = client.get("/.well-known/jwks.json")
+        assert response.status_code == 200
+        assert "max-age" in response.headers["cache-control"]
+        jwk = response.json()["keys"][0]
+        assert jwt.get_unverified_header(token)["kid"] == jwk["kid"]
+
+        # A resource server needs nothing but the JWKS.
+        public_key = jwt.PyJWK(jwk).key
+        payload = jwt.decode(token, public_key, algorithms=["RS256"])
+        assert payload["sub"] == FIRST_SUPERUSER_USERNAME
+
+        response = client.get(
+            "/users/me/", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+    finally:
+        key_store.reset()
+        purge_token_cache()
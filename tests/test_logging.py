@@ -0,0 +1,66 @@
+import json
+import logging
+
+from common.logger_config import JsonFormatter, RateLimitFilter
+
+
+def _record(
+    msg: str, lineno: int = 1, level: int = logging.INFO
+) -> logging.LogRecord:
+    return logging.LogRecord("auth", level, __file__, lineno, msg, None, None)
+
+
+def test_rate_limit_filter_suppresses_repeated_messages():
+    rate_limit = RateLimitFilter(rate=2, interval=60)
+
+    allowed = [rate_limit.filter(_record("Invalid token.")) for _ in range(5)]
+
+    assert allowed == [True, True, False, False, False]
+    assert rate_limit.filter(_record("Another message", lineno=2))
+
+
+def test_rate_limit_filter_never_holds_back_errors():
+    rate_limit = RateLimitFilter(rate=1, interval=60)
+
+    allowed = [
+        rate_limit.filter(_record("Database down.", level=logging.ERROR))
+        for _ in range(5)
+    ]
+
+    assert allowed == [True] * 5
+
+
+def test_rate_limit_filter_groups_formatted_messages_by_call_site():
+    rate_limit = RateLimitFilter(rate=1, interval=60)
+
+    allowed = [rate_limit.filter(_record(f"Invalid token for {n}.")) for n in range(3)]
+
+    assert allowed == [True, False, False]
+
+
+def test_rate_limit_filter_caps_tracked_call_sites():
+    rate_limit = RateLimitFilter(rate=1, interval=60, max_entries=3)
+
+    for lineno in range(10):
+        rate_limit.filter(_record("Invalid token.", lineno=lineno))
+
+    assert len(rate_limit._windows) == 3
+    assert rate_limit.filter(_record("Invalid token.", lineno=0))
+
+
+def test_rate_limit_filter_drops_expired_windows():
+    rate_limit = RateLimitFilter(rate=1, interval=0)
+
+    for lineno in range(10):
+        rate_limit.filter(_record("Invalid token.", lineno=lineno))
+
+    assert len(rate_limit._windows) == 1
+
+
+def test_json_formatter_writes_one_object_per_record():
+    line = JsonFormatter().format(_record("User logged in"))
+
+    entry = json.loads(line)
+    assert entry["message"] == "User logged in"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "auth"
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db.exceptions import SchemaVersionError
+from db.migrations import (
+    SCHEMA_VERSION,
+    backfill_normalized,
+    check_schema_version,
+    get_schema_version,
+    migrate,
+)
+
+
+def _engine(tmp_path):
+    return create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}")
+
+
+def test_fresh_database_is_created_at_current_version(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        try:
+            with pytest.raises(SchemaVersionError):
+                await check_schema_version(engine)
+            await migrate(engine)
+            await check_schema_version(engine)
+            return await get_schema_version(engine)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == SCHEMA_VERSION
+
+
+def test_unversioned_database_is_upgraded(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text(
+                    "CREATE TABLE users (id INTEGER PRIMARY KEY, "
+                    "username VARCHAR(255), password VARCHAR(255) NOT NULL, "
+                    "email VARCHAR(255), is_active BOOLEAN)"
+                ))
+                await conn.execute(text(
+                    "INSERT INTO users (username, password, email, is_active) "
+                    "VALUES ('Old', 'hash', 'Old@Example.com', 1), "
+                    "('OLD', 'hash', 'other@example.com', 1)"
+                ))
+            assert await get_schema_version(engine) == 1
+
+            await migrate(engine)
+            async with engine.connect() as conn:
+                columns = await conn.run_sync(
+                    lambda sync_conn: {
+                        c["name"] for c in inspect(sync_conn).get_columns("users")
+                    }
+                )
+                token_version = (await conn.execute(
+                    text("SELECT token_version FROM users WHERE id = 1")
+                )).scalar_one()
+                normalized = (await conn.execute(text(
+                    "SELECT username_normalized, email_normalized FROM users "
+                    "ORDER BY id"
+                ))).all()
+            return columns, token_version, normalized, await get_schema_version(engine)
+        finally:
+            await engine.dispose()
+
+    columns, token_version, normalized, version = asyncio.run(run())
+    assert "token_version" in columns
+    assert token_version == 0
+    # The second username clashes with the first once normalized, so only that
+    # column is left for review.
+    assert normalized == [("old", "old@example.com"), (None, "other@example.com")]
+    assert version == SCHEMA_VERSION
+
+
+def test_email_clash_still_backfills_the_username(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        try:
+            await migrate(engine)
+            # Users inserted by workers that predate the normalized columns.
+            async with engine.begin() as conn:
+                await conn.execute(text(
+                    "INSERT INTO users (username, password, email, is_active) "
+                    "VALUES ('Alice', 'hash', 'Shared@Example.com', 1), "
+                    "('Bob', 'hash', 'shared@example.com', 1)"
+                ))
+            updated = await backfill_normalized(engine)
+            async with engine.connect() as conn:
+                normalized = (await conn.execute(text(
+                    "SELECT username_normalized, email_normalized FROM users "
+                    "ORDER BY id"
+                ))).all()
+            return updated, normalized
+        finally:
+            await engine.dispose()
+
+    updated, normalized = asyncio.run(run())
+    assert updated == 2
+    assert normalized == [("alice", "shared@example.com"), ("bob", None)]
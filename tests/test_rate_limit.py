@@ -0,0 +1,102 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from users.rate_limit import MemoryRateLimitBackend, SQLiteRateLimitBackend
+
+
+async def _hits(backend, count: int) -> list[float]:
+    return [await backend.hit("login:ip:1.2.3.4", 3, 60) for _ in range(count)]
+
+
+def test_memory_backend_allows_limit_then_rejects():
+    retry_afters = asyncio.run(_hits(MemoryRateLimitBackend(), 4))
+
+    assert retry_afters[:3] == [0.0, 0.0, 0.0]
+    # The full window still weighs on the next one, so the wait exceeds it.
+    assert 60 < retry_afters[3] <= 120
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite"])
+def test_retry_after_is_enough_to_be_let_in(tmp_path, monkeypatch, backend_name):
+    backend = (
+        MemoryRateLimitBackend()
+        if backend_name == "memory"
+        else SQLiteRateLimitBackend(str(tmp_path / "rate_limits.db"))
+    )
+    clock = [0.0]
+    monkeypatch.setattr("users.rate_limit.time.time", lambda: clock[0])
+
+    async def hit():
+        return await backend.hit("login:ip:1.2.3.4", 3, 60)
+
+    async def scenario():
+        for _ in range(3):
+            assert await hit() == 0.0
+        retry_after = await hit()
+        clock[0] += retry_after
+        return retry_after, await hit()
+
+    retry_after, after_waiting = asyncio.run(scenario())
+    assert retry_after == pytest.approx(80)
+    assert after_waiting == 0.0
+
+
+def test_memory_backend_prunes_each_key_against_its_own_window(monkeypatch):
+    backend = MemoryRateLimitBackend(max_keys=10)
+    clock = [1000.0]
+    monkeypatch.setattr("users.rate_limit.time.time", lambda: clock[0])
+
+    async def scenario():
+        await backend.hit("signup:ip:1.2.3.4", 1, 3600)
+        for n in range(9):
+            await backend.hit(f"login:ip:{n}", 3, 1)
+        clock[0] += 10
+        await backend.hit("login:ip:new", 3, 1)
+        return await backend.hit("signup:ip:1.2.3.4", 1, 3600)
+
+    assert asyncio.run(scenario()) > 0
+    assert list(backend._windows) == ["login:ip:new", "signup:ip:1.2.3.4"]
+
+
+def test_memory_backend_evicts_least_recently_hit_keys_over_the_cap():
+    backend = MemoryRateLimitBackend(max_keys=10)
+
+    async def scenario():
+        for n in range(11):
+            await backend.hit(f"login:ip:{n}", 3, 60)
+
+    asyncio.run(scenario())
+
+    assert len(backend._windows) == backend.low_water
+    assert "login:ip:0" not in backend._windows
+    assert "login:ip:10" in backend._windows
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+
+    asyncio.run(_hits(SQLiteRateLimitBackend(path), 3))
+    retry_afters = asyncio.run(_hits(SQLiteRateLimitBackend(path), 1))
+
+    assert retry_afters[0] > 0
+
+
+def test_sqlite_backend_deletes_expired_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / "rate_limits.db")
+    backend = SQLiteRateLimitBackend(path, prune_every=3)
+    clock = [1000.0]
+    monkeypatch.setattr("users.rate_limit.time.time", lambda: clock[0])
+
+    async def scenario():
+        await backend.hit("signup:ip:1.2.3.4", 1, 3600)
+        await backend.hit("login:ip:1.2.3.4", 3, 60)
+        clock[0] += 600
+        await backend.hit("login:ip:5.6.7.8", 3, 60)
+
+    asyncio.run(scenario())
+
+    with sqlite3.connect(path) as conn:
+        keys = [row[0] for row in conn.execute("SELECT key FROM rate_limits")]
+    assert sorted(keys) == ["login:ip:5.6.7.8", "signup:ip:1.2.3.4"]
@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+from common.bloom import BloomFilter
+from common.cache import Cache, SQLiteCacheBackend
+from db.querys import utcnow
+from tests.testing_db import (
+    FIRST_SUPERUSER_PASSWORD,
+    FIRST_SUPERUSER_USERNAME,
+    TestingSessionLocal,
+)
+from users.revocation import TokenDenylist, denylist
+
+
+def _login(client: TestClient, username: str, password: str) -> dict:
+    return client.post(
+        "/login", data={"username": username, "password": password}
+    ).json()
+
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(2000))
+    assert false_positives < 100
+
+
+def test_logout_revokes_access_and_refresh_tokens(client: TestClient):
+    tokens = _login(client, FIRST_SUPERUSER_USERNAME, FIRST_SUPERUSER_PASSWORD)
+    other = _login(client, FIRST_SUPERUSER_USERNAME, FIRST_SUPERUSER_PASSWORD)
+    skipped = denylist.skipped
+
+    response = client.get("/users/me/", headers=_auth(tokens["access_token"]))
+    assert response.status_code == 200
+    assert denylist.skipped == skipped + 1
+
+    response = client.post(
+        "/logout",
+        headers=_auth(tokens["access_token"]),
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert response.status_code == 204
+
+    response = client.get("/users/me/", headers=_auth(tokens["access_token"]))
+    assert response.status_code == 401
+    response = client.post(
+        "/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+    # Other sessions of the same user are untouched.
+    response = client.get("/users/me/", headers=_auth(other["access_token"]))
+    assert response.status_code == 200
+
+
+def test_only_the_admin_can_revoke_other_tokens(client: TestClient):
+    client.post("/users/", json={
+        "username": "revokee",
+        "email": "revokee@example.com",
+        "password": "Revokee123$",
+    })
+    user_token = _login(client, "revokee", "Revokee123$")["access_token"]
+    admin_token = _login(
+        client, FIRST_SUPERUSER_USERNAME, FIRST_SUPERUSER_PASSWORD
+    )["access_token"]
+
+    response = client.post(
+        "/tokens/revoke", headers=_auth(user_token), json={"token": admin_token}
+    )
+    assert response.status_code == 403
+
+    response = client.post(
+        "/tokens/revoke", headers=_auth(admin_token), json={"token": user_token}
+    )
+    assert response.status_code == 204
+    response = client.get("/users/me/", headers=_auth(user_token))
+    assert response.status_code == 401
+
+
+def test_revocation_reaches_the_other_workers(client: TestClient, tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    workers = [
+        TokenDenylist(
+            capacity=1000,
+            versions=Cache(
+                backend, namespace="token_denylist", version_check_interval=0
+            ),
+        )
+        for _ in range(2)
+    ]
+    jti = uuid.uuid4().hex
+
+    async def scenario():
+        async with TestingSessionLocal() as session:
+            for worker in workers:
+                await worker.rebuild(session)
+            before = await workers[1].is_revoked(jti, session)
+            await workers[0].revoke(jti, utcnow() + timedelta(hours=1), session)
+            after = await workers[1].is_revoked(jti, session)
+            batch = await workers[1].find_revoked([jti, uuid.uuid4().hex], session)
+            return before, after, batch
+
+    before, after, batch = asyncio.run(scenario())
+    assert not before
+    assert after
+    assert batch == {jti}
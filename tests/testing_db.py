@@ -8,10 +8,13 @@ from sqlalchemy.pool import StaticPool
 
 
 from db.schemas import Base, UsersDB 
-from db.access import get_db 
+from db.access import get_db, get_read_db, get_read_sessionmaker, get_sessionmaker
+from db.querys import user_cache
 from common.app_factory import create_app
 from common.config import settings
 from users.helper import get_password_hash
+from users.rate_limit import rate_limiter
+from users.revocation import denylist
 
 
 TEST_DATABASE_URL = settings.TEST_DATABASE_URL
@@ -43,6 +46,9 @@ async def override_get_db():
         yield session
 
 app_testing.dependency_overrides[get_db] = override_get_db
+app_testing.dependency_overrides[get_read_db] = override_get_db
+app_testing.dependency_overrides[get_sessionmaker] = lambda: TestingSessionLocal
+app_testing.dependency_overrides[get_read_sessionmaker] = lambda: TestingSessionLocal
 
 
 # 👉 Initialisation des tables au début des tests
@@ -55,6 +61,9 @@ def anyio_backend():
 def client():
     asyncio.run(init_db())  # crée les tables avant d'exécuter les tests
     asyncio.run(seed_admin()) 
+    asyncio.run(user_cache.clear())
+    rate_limiter.reset()
+    denylist.reset()
     with TestClient(app_testing) as c:
         yield c
 
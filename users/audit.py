@@ -0,0 +1,219 @@
+import asyncio
+import threading
+from collections import deque
+
+from fastapi import Request
+from sqlalchemy.exc import (
+    DataError,
+    DisconnectionError,
+    IntegrityError,
+    InterfaceError,
+    OperationalError,
+)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from common.config import settings
+from common.logger_config import logger
+from common.metrics import registry
+from db.querys import insert_auth_events_query, utcnow
+
+# Errors caused by one bad row, the rest of its batch can still be written.
+ROW_ERRORS = (IntegrityError, DataError)
+# Errors meaning the database cannot be reached at all right now.
+CONNECTION_ERRORS = (
+    OperationalError,
+    InterfaceError,
+    DisconnectionError,
+    PoolTimeoutError,
+    OSError,
+)
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class AuditLog:
+    """Write-behind log of authentication events.
+
+    Requests only append to a bounded in-memory queue; a background task
+    writes the events in multi-row batches, when ``batch_size`` events are
+    waiting or every ``flush_interval`` seconds. Events arriving while the
+    queue is full are dropped and counted rather than slowing requests down.
+    A batch rejected because of a bad row is retried one event at a time, so
+    that row only loses itself. When the database is unreachable the batch
+    goes back to the queue and flushing backs off, up to a minute.
+
+    Args:
+        max_size (int): Maximum number of queued events.
+        batch_size (int): Events written per INSERT.
+        flush_interval (float): Longest time an event waits, in seconds.
+    """
+
+    def __init__(
+        self, max_size: int = 10_000, batch_size: int = 500, flush_interval: float = 1.0
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._events: deque[dict] = deque()
+        self._lock = threading.Lock()
+        self._wakeup: asyncio.Event | None = None
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.backoff = 0.0
+
+    def record(
+        self,
+        event: str,
+        outcome: str,
+        username: str | None = None,
+        user_id: int | None = None,
+        request: Request | None = None,
+    ):
+        if not settings.AUDIT_ENABLED:
+            return
+
+        ip = user_agent = None
+        if request is not None:
+            ip = request.client.host if request.client else None
+            user_agent = request.headers.get("user-agent", "")[:255] or None
+        # Usernames come straight from login forms, keep them within the column.
+        if username is not None:
+            username = username[:255]
+
+        with self._lock:
+            if len(self._events) >= self.max_size:
+                self.dropped += 1
+                return
+            self._events.append(
+                {
+                    "event": event,
+                    "outcome": outcome,
+                    "username": username,
+                    "user_id": user_id,
+                    "ip": ip,
+                    "user_agent": user_agent,
+                    "created_at": utcnow(),
+                }
+            )
+            self.recorded += 1
+            full = len(self._events) >= self.batch_size
+
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _take_batch(self) -> list[dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._events))
+            return [self._events.popleft() for _ in range(count)]
+
+    def _requeue(self, events: list[dict]):
+        with self._lock:
+            room = max(self.max_size - len(self._events), 0)
+            self._events.extendleft(reversed(events[:room]))
+            self.dropped += len(events) - min(room, len(events))
+
+    async def _insert(self, events: list[dict], session_factory):
+        async with session_factory() as session:
+            await insert_auth_events_query(events, session)
+
+    async def _write(self, batch: list[dict], session_factory) -> tuple[int, bool]:
+        """Write a batch; return the events written and if the database was down.
+
+        Events not attempted because the database was down are requeued.
+        """
+        try:
+            await self._insert(batch, session_factory)
+            return len(batch), False
+        except ROW_ERRORS as e:
+            logger.warning(
+                f"Audit batch of {len(batch)} events rejected, retrying one by one: {e}"
+            )
+        except CONNECTION_ERRORS as e:
+            logger.error(
+                f"Audit database unavailable, {len(batch)} events requeued: {e}"
+            )
+            self._requeue(batch)
+            return 0, True
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} audit events: {e}")
+            return 0, False
+
+        written = 0
+        for position, event in enumerate(batch):
+            try:
+                await self._insert([event], session_factory)
+                written += 1
+            except CONNECTION_ERRORS as e:
+                logger.error(
+                    f"Audit database unavailable, {len(batch) - position} events "
+                    f"requeued: {e}"
+                )
+                self._requeue(batch[position:])
+                return written, True
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to write audit event {event['event']}: {e}")
+        return written, False
+
+    async def flush(self, session_factory) -> int:
+        """Write every queued event and return how many were written.
+
+        Stops at the first batch that finds the database down, so an outage
+        costs one connection attempt per flush.
+        """
+        written, unavailable = 0, False
+        while not unavailable and (batch := self._take_batch()):
+            batch_written, unavailable = await self._write(batch, session_factory)
+            written += batch_written
+        if unavailable:
+            self.backoff = min(
+                max(2 * self.backoff, self.flush_interval), MAX_BACKOFF_SECONDS
+            )
+        else:
+            self.backoff = 0.0
+        self.written += written
+        return written
+
+    async def run(self, session_factory):
+        """Background task flushing on size or time; drains when cancelled."""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                if self.backoff:
+                    # Full batches would wake us up at once, wait out the outage.
+                    await asyncio.sleep(self.backoff)
+                else:
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(), timeout=self.flush_interval
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                self._wakeup.clear()
+                await self.flush(session_factory)
+        finally:
+            self._wakeup = None
+            await asyncio.shield(self.flush(session_factory))
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._events),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+audit_log = AuditLog(
+    max_size=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+)
+registry.register_collector("audit_log", audit_log.stats)
@@ -0,0 +1,269 @@
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+from common.bloom import BloomFilter
+from common.config import settings
+from common.logger_config import logger
+
+# Index layout: header, then BUCKETS + 1 record offsets indexed by the first
+# two bytes of a record, then the sorted, unique, fixed-width records. Each
+# record is the first ``prefix_bytes`` bytes of the SHA-1 of a password.
+INDEX_MAGIC = b"BRPWIDX1"
+INDEX_HEADER = struct.Struct("<8sB7xQ")
+BLOOM_MAGIC = b"BRPWBLM1"
+BLOOM_HEADER = struct.Struct("<8sQB7x")
+BUCKETS = 1 << 16
+OFFSET = struct.Struct("<Q")
+# Records are bucketed on their first two bytes and cut from a SHA-1 digest.
+MIN_PREFIX_BYTES = 2
+MAX_PREFIX_BYTES = hashlib.sha1().digest_size
+
+
+def password_key(password: str, prefix_bytes: int = 8) -> bytes:
+    return hashlib.sha1(password.encode("utf-8")).digest()[:prefix_bytes]
+
+
+def parse_dump_line(line: str, fmt: str, prefix_bytes: int) -> bytes | None:
+    """Turn one dump line into an index record.
+
+    ``sha1`` lines are ``<40 hex chars>[:count]`` as in public breach corpora;
+    ``plain`` lines are passwords in clear.
+    """
+    line = line.rstrip("\r\n")
+    if not line:
+        return None
+    if fmt == "plain":
+        return password_key(line, prefix_bytes)
+    digest = line.split(":", 1)[0].strip()
+    if len(digest) != 40:
+        return None
+    try:
+        return bytes.fromhex(digest)[:prefix_bytes]
+    except ValueError:
+        return None
+
+
+def _sorted_chunks(
+    records: Iterable[bytes], chunk_size: int, directory: str
+) -> list[str]:
+    # External sort: the dump may be far larger than memory.
+    paths = []
+    chunk = []
+
+    def flush():
+        fd, path = tempfile.mkstemp(dir=directory, suffix=".chunk")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"".join(sorted(set(chunk))))
+        paths.append(path)
+        chunk.clear()
+
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return paths
+
+
+def _read_records(path: str, prefix_bytes: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while record := f.read(prefix_bytes):
+            yield record
+
+
+def build_index(
+    records: Iterable[bytes],
+    output: str,
+    prefix_bytes: int = 8,
+    chunk_size: int = 5_000_000,
+    bloom_error_rate: float | None = None,
+) -> int:
+    """Write a sorted breached-password index and return its record count.
+
+    The index and its Bloom filter are written to temporary files and renamed
+    in place together, the filter first, so a reader never pairs the new
+    index with a stale filter. Building without a filter removes the old one.
+
+    Args:
+        records (Iterable[bytes]): Password keys, in any order, duplicates allowed.
+        output (str): Path of the index; the Bloom filter goes to ``.bloom``.
+        prefix_bytes (int): Width of a record, 8 keeps collisions negligible.
+        chunk_size (int): Records sorted in memory at once.
+        bloom_error_rate (float | None): Build a Bloom pre-filter with this
+            false positive rate, or none.
+
+    Raises:
+        ValueError: If ``prefix_bytes`` is outside the supported range.
+    """
+    if not MIN_PREFIX_BYTES <= prefix_bytes <= MAX_PREFIX_BYTES:
+        raise ValueError(
+            f"prefix_bytes must be between {MIN_PREFIX_BYTES} and {MAX_PREFIX_BYTES}"
+        )
+    directory = os.path.dirname(os.path.abspath(output))
+    chunks = _sorted_chunks(records, chunk_size, directory)
+    bucket_counts = [0] * BUCKETS
+    count = 0
+    records_start = INDEX_HEADER.size + (BUCKETS + 1) * OFFSET.size
+
+    bloom_path = output + ".bloom"
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    bloom_tmp_path = None
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.seek(records_start)
+            previous = None
+            merged = heapq.merge(
+                *(_read_records(path, prefix_bytes) for path in chunks)
+            )
+            for record in merged:
+                if record == previous:
+                    continue
+                f.write(record)
+                bucket_counts[int.from_bytes(record[:2], "big")] += 1
+                previous = record
+                count += 1
+
+            offsets, total = [], 0
+            for bucket_count in bucket_counts:
+                offsets.append(total)
+                total += bucket_count
+            offsets.append(total)
+
+            f.seek(0)
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, prefix_bytes, count))
+            f.write(struct.pack(f"<{BUCKETS + 1}Q", *offsets))
+
+        if bloom_error_rate is not None:
+            fd, bloom_tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            os.close(fd)
+            _build_bloom(tmp_path, bloom_tmp_path, bloom_error_rate)
+            os.replace(bloom_tmp_path, bloom_path)
+        elif os.path.exists(bloom_path):
+            os.unlink(bloom_path)
+        os.replace(tmp_path, output)
+    finally:
+        for path in chunks:
+            os.unlink(path)
+        for path in (tmp_path, bloom_tmp_path):
+            if path is not None and os.path.exists(path):
+                os.unlink(path)
+    return count
+
+
+def _build_bloom(index_path: str, output: str, error_rate: float):
+    index = BreachedPasswordIndex(index_path, use_bloom=False)
+    try:
+        bloom = BloomFilter(max(index.count, 1), error_rate)
+        for record in index.records():
+            bloom.add(record.hex())
+    finally:
+        index.close()
+
+    with open(output, "wb") as f:
+        f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, bloom.num_bits, bloom.num_hashes))
+        f.write(bloom.to_bytes())
+
+
+def _map(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BreachedPasswordIndex:
+    """Read-only view of an index built by ``build_index``.
+
+    The file is memory-mapped, so every worker shares the OS page cache
+    instead of loading its own copy. A lookup reads one bucket offset pair
+    and binary searches that bucket; the optional Bloom filter, mapped the
+    same way, answers most misses without touching the records.
+
+    Args:
+        path (str): Path of the index.
+        use_bloom (bool): Use ``<path>.bloom`` when it exists.
+    """
+
+    def __init__(self, path: str, use_bloom: bool = True):
+        self.path = path
+        self._mm = _map(path)
+        magic, self.prefix_bytes, self.count = INDEX_HEADER.unpack_from(self._mm)
+        if magic != INDEX_MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a breached password index")
+        self._records_start = INDEX_HEADER.size + (BUCKETS + 1) * OFFSET.size
+
+        self._bloom_mm = None
+        self._bloom_bits = None
+        self.bloom = None
+        bloom_path = path + ".bloom"
+        if use_bloom and os.path.exists(bloom_path):
+            self._bloom_mm = _map(bloom_path)
+            magic, num_bits, num_hashes = BLOOM_HEADER.unpack_from(self._bloom_mm)
+            if magic == BLOOM_MAGIC:
+                self._bloom_bits = memoryview(self._bloom_mm)[BLOOM_HEADER.size :]
+                self.bloom = BloomFilter.from_buffer(
+                    self._bloom_bits, num_bits, num_hashes
+                )
+
+    def _record(self, position: int) -> bytes:
+        start = self._records_start + position * self.prefix_bytes
+        return self._mm[start : start + self.prefix_bytes]
+
+    def records(self) -> Iterator[bytes]:
+        for position in range(self.count):
+            yield self._record(position)
+
+    def contains_key(self, key: bytes) -> bool:
+        if self.bloom is not None and key.hex() not in self.bloom:
+            return False
+
+        bucket = int.from_bytes(key[:2], "big")
+        low = OFFSET.unpack_from(self._mm, INDEX_HEADER.size + bucket * OFFSET.size)[0]
+        high = OFFSET.unpack_from(
+            self._mm, INDEX_HEADER.size + (bucket + 1) * OFFSET.size
+        )[0]
+        while low < high:
+            middle = (low + high) // 2
+            record = self._record(middle)
+            if record == key:
+                return True
+            if record < key:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_key(password_key(password, self.prefix_bytes))
+
+    def close(self):
+        self.bloom = None
+        if self._bloom_bits is not None:
+            self._bloom_bits.release()
+        if self._bloom_mm is not None:
+            self._bloom_mm.close()
+        self._mm.close()
+
+
+@lru_cache()
+def get_breached_index() -> BreachedPasswordIndex | None:
+    path = settings.BREACHED_PASSWORDS_FILE
+    if not path:
+        return None
+    try:
+        return BreachedPasswordIndex(path, use_bloom=settings.BREACHED_PASSWORDS_BLOOM)
+    except (OSError, ValueError) as e:
+        logger.error(f"Breached password check disabled, cannot open {path}: {e}")
+        return None
+
+
+def is_breached_password(password: str) -> bool:
+    """Whether ``password`` is in the configured breach index, if any."""
+    index = get_breached_index()
+    return index is not None and password in index
@@ -0,0 +1,230 @@
+import asyncio
+import csv
+import json
+import tempfile
+from typing import AsyncIterable, AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.logger_config import logger
+from db.querys import bulk_insert_users, find_existing_users
+from models.validators import UserValidator, normalize_email, normalize_username
+from users.breached import is_breached_password
+from users.hashing import password_hasher
+
+
+# Uploads larger than this are spooled to a temporary file instead of memory.
+SPOOL_MAX_MEMORY = 1024 * 1024
+# Approximate number of bytes read from the spool per worker-thread call.
+SPOOL_READ_SIZE = 64 * 1024
+
+
+async def spool_chunks(chunks: AsyncIterable[bytes]) -> tempfile.SpooledTemporaryFile:
+    """Store an upload so it can be read after the request body is consumed.
+
+    The import results are streamed back while the rows are processed, and a
+    streaming response cannot keep reading the request body at the same time.
+    Writes run in a worker thread, since the spool rolls over to disk once it
+    outgrows ``SPOOL_MAX_MEMORY``.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(spool.write, chunk)
+        await asyncio.to_thread(spool.seek, 0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+async def iter_spooled_lines(spool) -> AsyncIterator[bytes]:
+    """Yield the raw lines of a spooled upload, then close it.
+
+    Lines are read in batches of about ``SPOOL_READ_SIZE`` bytes in a worker
+    thread and left undecoded, so one bad line cannot end the stream.
+    """
+    try:
+        while lines := await asyncio.to_thread(spool.readlines, SPOOL_READ_SIZE):
+            for line in lines:
+                yield line
+    finally:
+        await asyncio.to_thread(spool.close)
+
+
+async def parse_records(
+    lines: AsyncIterable[str | bytes], fmt: str = "jsonl"
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """Parse JSON Lines or CSV input one line at a time.
+
+    Byte lines are decoded as UTF-8 one by one; a line that does not decode
+    is reported as invalid and the following lines are still parsed.
+
+    Yields:
+        tuple[int, dict | str]: The line number and either the record or the
+        reason it could not be parsed.
+    """
+    header = None
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if isinstance(line, bytes):
+            try:
+                line = line.decode("utf-8")
+            except UnicodeDecodeError as e:
+                yield line_no, f"Invalid UTF-8 at byte {e.start}"
+                continue
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+
+        if fmt == "csv":
+            row = next(csv.reader([line]))
+            if header is None:
+                header = [column.strip() for column in row]
+                continue
+            if len(row) != len(header):
+                yield line_no, f"Expected {len(header)} columns, got {len(row)}"
+                continue
+            yield line_no, dict(zip(header, row))
+            continue
+
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, "Expected a JSON object"
+            continue
+        yield line_no, record
+
+
+def _result(line: int, username, status: str, detail: str | None = None) -> dict:
+    return {"line": line, "username": username, "status": status, "detail": detail}
+
+
+async def _hash_passwords(passwords: list[str]) -> list[str]:
+    # Leave half of the hashing queue to interactive logins and signups.
+    slots = asyncio.Semaphore(max(1, password_hasher.max_pending // 2))
+
+    async def hash_one(password: str) -> str:
+        async with slots:
+            return await password_hasher.hash_password(password, queue_timeout=None)
+
+    return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+
+async def _import_batch(
+    batch: list[tuple[int, dict | str]], db: AsyncSession
+) -> list[dict]:
+    results = {}
+    candidates = []
+    seen_usernames, seen_emails = set(), set()
+
+    for line, record in batch:
+        if isinstance(record, str):
+            results[line] = _result(line, None, "invalid", record)
+            continue
+
+        username = record.get("username")
+        try:
+            user = UserValidator(
+                username=username,
+                email=record.get("email"),
+                password=record.get("password"),
+            )
+        except ValidationError as e:
+            results[line] = _result(line, username, "invalid", e.errors()[0]["msg"])
+            continue
+
+        if is_breached_password(user.password):
+            results[line] = _result(
+                line, username, "invalid", "Password appears in a known data breach"
+            )
+            continue
+
+        username_key = normalize_username(user.username)
+        email_key = normalize_email(user.email)
+        if username_key in seen_usernames or email_key in seen_emails:
+            results[line] = _result(
+                line, username, "duplicate", "Duplicated in the input"
+            )
+            continue
+        seen_usernames.add(username_key)
+        seen_emails.add(email_key)
+        candidates.append((line, user))
+
+    taken_usernames, taken_emails = await find_existing_users(
+        db, seen_usernames, seen_emails
+    )
+    to_insert = []
+    for line, user in candidates:
+        if (
+            normalize_username(user.username) in taken_usernames
+            or normalize_email(user.email) in taken_emails
+        ):
+            results[line] = _result(
+                line, user.username, "duplicate", "Username or email already exists"
+            )
+        else:
+            to_insert.append((line, user))
+
+    hashes = await _hash_passwords([user.password for _, user in to_insert])
+    rows = [
+        {
+            "username": user.username,
+            "username_normalized": normalize_username(user.username),
+            "email": user.email,
+            "email_normalized": normalize_email(user.email),
+            "password": hashed_password,
+            "is_active": True,
+        }
+        for (_, user), hashed_password in zip(to_insert, hashes)
+    ]
+
+    try:
+        await bulk_insert_users(rows, db)
+        for line, user in to_insert:
+            results[line] = _result(line, user.username, "created")
+    except IntegrityError:
+        # A concurrent signup took one of the names; fall back to row inserts.
+        await db.rollback()
+        logger.warning("Bulk insert conflicted, retrying batch row by row.")
+        for (line, user), row in zip(to_insert, rows):
+            try:
+                await bulk_insert_users([row], db)
+                results[line] = _result(line, user.username, "created")
+            except IntegrityError:
+                await db.rollback()
+                results[line] = _result(
+                    line, user.username, "duplicate", "Username or email already exists"
+                )
+
+    return [results[line] for line in sorted(results)]
+
+
+async def import_users(
+    records: AsyncIterable[tuple[int, dict | str]],
+    db: AsyncSession,
+    batch_size: int = 500,
+) -> AsyncIterator[dict]:
+    """Import users batch by batch, yielding one result per input record.
+
+    Each batch is validated, checked for duplicates with one query, hashed in
+    parallel and written with one multi-row INSERT, so memory use is bounded
+    by ``batch_size`` whatever the input size.
+    """
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            for result in await _import_batch(batch, db):
+                yield result
+            batch = []
+
+    if batch:
+        for result in await _import_batch(batch, db):
+            yield result
@@ -31,3 +31,75 @@ class InactiveUserException(HTTPException):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=detail,
         )
+
+
+class UserConflictException(HTTPException):
+    """Exception raised when a username or email is already taken.
+
+    Args:
+        HTTPException (409): Conflict exception for duplicate users.
+    """
+
+    def __init__(self, detail: list[str] | str = "User already exists"):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail,
+        )
+
+
+class InvalidRequestException(HTTPException):
+    """Exception raised when request parameters are invalid.
+
+    Args:
+        HTTPException (400): Bad request exception for invalid parameters.
+    """
+
+    def __init__(self, detail: list[str] | str = "Invalid request"):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail,
+        )
+
+
+class TooManyRequestsException(HTTPException):
+    """Exception raised when a client exceeds its rate limit.
+
+    Args:
+        HTTPException (429): Too many requests exception for throttled clients.
+    """
+
+    def __init__(self, detail: str = "Too many requests", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class ServiceUnavailableException(HTTPException):
+    """Exception raised when the server is too busy to take more work.
+
+    Args:
+        HTTPException (503): Service unavailable exception for overload.
+    """
+
+    def __init__(self, detail: str = "Service unavailable", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class ForbiddenException(HTTPException):
+    """Exception raised when a user lacks the rights for an action.
+
+    Args:
+        HTTPException (403): Forbidden exception for unauthorized actions.
+    """
+
+    def __init__(self, detail: str = "Not enough privileges"):
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail,
+        )
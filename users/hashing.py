@@ -0,0 +1,150 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from common.config import settings
+from common.logger_config import logger
+from common.metrics import registry, stage_duration
+from users import helper
+from users.exceptions import ServiceUnavailableException
+
+# Sentinel telling a job to use the service's own queue timeout.
+DEFAULT_QUEUE_TIMEOUT = -1.0
+
+
+class PasswordHasher:
+    """Async facade running bcrypt hashing and verification in a worker pool.
+
+    bcrypt releases the GIL, so a thread pool already scales with CPU cores;
+    a process pool is available for hashing schemes that do not.
+
+    Args:
+        executor_type (str): "thread" or "process".
+        max_workers (int | None): Pool size. None lets the executor decide.
+        max_pending (int): Maximum number of jobs queued or running at once.
+        queue_timeout (float): Seconds to wait for a free slot before failing.
+    """
+
+    def __init__(
+        self,
+        executor_type: str = "thread",
+        max_workers: int | None = None,
+        max_pending: int = 64,
+        queue_timeout: float = 5.0,
+    ):
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._slots_loop: asyncio.AbstractEventLoop | None = None
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hasher"
+                )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # A semaphore is bound to the loop it first waits on, so build a new
+        # one whenever the service is used from a different loop.
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _run(
+        self, func, *args, queue_timeout: float | None = DEFAULT_QUEUE_TIMEOUT
+    ):
+        if queue_timeout == DEFAULT_QUEUE_TIMEOUT:
+            queue_timeout = self.queue_timeout
+        slots = self._get_slots()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        started = time.perf_counter()
+        try:
+            try:
+                await asyncio.wait_for(slots.acquire(), timeout=queue_timeout)
+            except TimeoutError:
+                self.rejected += 1
+                logger.warning("Password hashing queue is full, rejecting job.")
+                raise ServiceUnavailableException(
+                    detail="Server is busy, retry later"
+                ) from None
+
+            waited = time.perf_counter() - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            try:
+                loop = asyncio.get_running_loop()
+                with stage_duration.time(func.__name__):
+                    return await loop.run_in_executor(
+                        self._get_executor(), func, *args
+                    )
+            finally:
+                slots.release()
+                self.completed += 1
+        finally:
+            self.queue_depth -= 1
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(helper.verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """Verify a password; also return a new hash if the stored one is outdated."""
+        return await self._run(
+            helper.verify_and_update, plain_password, hashed_password
+        )
+
+    async def hash_password(
+        self, password: str, queue_timeout: float | None = DEFAULT_QUEUE_TIMEOUT
+    ) -> str:
+        """Hash a password in the pool.
+
+        ``queue_timeout`` overrides the service default; None waits for a
+        slot indefinitely, which suits batch jobs.
+        """
+        return await self._run(
+            helper.get_password_hash, password, queue_timeout=queue_timeout
+        )
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._slots = None
+        self._slots_loop = None
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.HASH_EXECUTOR,
+    max_workers=settings.HASH_MAX_WORKERS,
+    max_pending=settings.HASH_MAX_PENDING,
+    queue_timeout=settings.HASH_QUEUE_TIMEOUT_SECONDS,
+)
+registry.register_collector("password_hasher", password_hasher.stats)
@@ -1,16 +1,46 @@
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 
+from common.config import settings
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_crypt_context() -> CryptContext:
+    """Build the password hashing policy from the settings.
+
+    The first scheme hashes new passwords; the others are only verified and
+    flagged for rehashing, as are hashes made with another cost.
+    """
+    options = {
+        "bcrypt__default_rounds": settings.BCRYPT_ROUNDS,
+        "bcrypt__min_rounds": settings.BCRYPT_ROUNDS,
+        "bcrypt__max_rounds": settings.BCRYPT_ROUNDS,
+    }
+    if "argon2" in settings.PASSWORD_SCHEMES:
+        # Needs the optional argon2-cffi package.
+        options.update(
+            argon2__time_cost=settings.ARGON2_TIME_COST,
+            argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+            argon2__parallelism=settings.ARGON2_PARALLELISM,
+        )
+    return CryptContext(
+        schemes=settings.PASSWORD_SCHEMES, deprecated="auto", **options
+    )
+
+
+pwd_context = build_crypt_context()
 
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update(plain_password, hashed_password):
+    """Verify a password and return a new hash if the stored one is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password):
     return pwd_context.hash(password)
@@ -0,0 +1,249 @@
+import asyncio
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from common.config import settings
+from common.logger_config import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotations are not serialized between workers.
+    fcntl = None
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "EdDSA")
+RSA_KEY_SIZE = 2048
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    created_at: float
+    private_key: Any
+    public_key: Any
+    jwk: dict
+
+
+def _generate_private_key(algorithm: str):
+    # cryptography is only needed for asymmetric signing.
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=RSA_KEY_SIZE)
+
+
+def _private_key_pem(private_key) -> bytes:
+    from cryptography.hazmat.primitives import serialization
+
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+def _load_private_key(pem: bytes):
+    from cryptography.hazmat.primitives import serialization
+
+    return serialization.load_pem_private_key(pem, password=None)
+
+
+def _public_jwk(algorithm: str, kid: str, public_key) -> dict:
+    from jwt.algorithms import get_default_algorithms
+
+    jwk = get_default_algorithms()[algorithm].to_jwk(public_key, as_dict=True)
+    jwk.update({"kid": kid, "alg": algorithm, "use": "sig"})
+    return jwk
+
+
+class KeyStore:
+    """Asymmetric signing keys kept as PEM files in a directory shared by workers.
+
+    Key files are named ``<created_at>-<random>.pem``; the stem is the key id
+    put in the ``kid`` header of every token. Parsed keys are cached by file
+    so a key is only loaded once per process.
+
+    A new key is only used for signing once it is ``activation_delay`` old,
+    which leaves every worker time to load it and resource servers time to
+    refetch the JWKS. A superseded key stays published for ``overlap`` seconds
+    so tokens it signed still verify. Workers rotate under an exclusive lock
+    file, so only one of them generates each new key.
+
+    Args:
+        directory (str): Where key files are stored.
+        algorithm (str): The JWT algorithm, RS256 or EdDSA.
+        rotation (float): Age in seconds after which a new key is generated.
+        overlap (float): How long a superseded key stays published.
+        activation_delay (float): Age a key must reach before signing.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        algorithm: str,
+        rotation: float,
+        overlap: float,
+        activation_delay: float = 0.0,
+    ):
+        self.directory = directory
+        self.algorithm = algorithm
+        self.rotation = rotation
+        self.overlap = overlap
+        self.activation_delay = activation_delay
+        self._keys: dict[str, SigningKey] = {}
+        self._last_reload = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def _paths(self) -> list[Path]:
+        directory = Path(self.directory)
+        if not directory.is_dir():
+            return []
+        return sorted(directory.glob("*.pem"))
+
+    def reload(self):
+        """Load new key files and forget deleted ones."""
+        with self._lock:
+            keys = {}
+            for path in self._paths():
+                kid = path.stem
+                key = self._keys.get(kid)
+                if key is None:
+                    try:
+                        created_at = float(kid.split("-", 1)[0])
+                        private_key = _load_private_key(path.read_bytes())
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Skipping unreadable signing key {path}: {e}")
+                        continue
+                    public_key = private_key.public_key()
+                    key = SigningKey(
+                        kid=kid,
+                        created_at=created_at,
+                        private_key=private_key,
+                        public_key=public_key,
+                        jwk=_public_jwk(self.algorithm, kid, public_key),
+                    )
+                keys[kid] = key
+            self._keys = keys
+            self._last_reload = time.monotonic()
+
+    def generate(self, now: float | None = None) -> str:
+        """Write a new key file and return its key id."""
+        now = time.time() if now is None else now
+        kid = f"{int(now)}-{secrets.token_hex(4)}"
+        directory = Path(self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        path = directory / f"{kid}.pem"
+        tmp_path = directory / f".{kid}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_private_key_pem(_generate_private_key(self.algorithm)))
+        # Other workers never see a half written key.
+        os.replace(tmp_path, path)
+        logger.info(f"Generated signing key {kid}.")
+        return kid
+
+    @contextmanager
+    def _rotation_lock(self):
+        directory = Path(self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / ".rotate.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def rotate(self, now: float | None = None):
+        """Generate a key when the newest one is due and drop expired ones.
+
+        Key generation is CPU bound, async callers run this in a thread.
+        """
+        now = time.time() if now is None else now
+        with self._rotation_lock():
+            self._rotate(now)
+
+    def _rotate(self, now: float):
+        # Reloading under the lock sees a key another worker just generated.
+        self.reload()
+
+        keys = sorted(self._keys.values(), key=lambda key: key.created_at)
+        if not keys or now - keys[-1].created_at >= self.rotation:
+            self.generate(now)
+            self.reload()
+            keys = sorted(self._keys.values(), key=lambda key: key.created_at)
+
+        # A key is superseded once the next one starts signing.
+        for key, successor in zip(keys, keys[1:]):
+            superseded_at = successor.created_at + self.activation_delay
+            if now - superseded_at > self.overlap:
+                try:
+                    (Path(self.directory) / f"{key.kid}.pem").unlink()
+                    logger.info(f"Retired signing key {key.kid}.")
+                except FileNotFoundError:
+                    pass
+        self.reload()
+
+    def signing_key(self, now: float | None = None) -> SigningKey:
+        """The newest key old enough to sign, or the newest key at all."""
+        if not self._keys:
+            self.rotate(now)
+        now = time.time() if now is None else now
+        keys = sorted(self._keys.values(), key=lambda key: key.created_at)
+        active = [key for key in keys if now - key.created_at >= self.activation_delay]
+        return (active or keys)[-1]
+
+    def verification_key(self, kid: str | None):
+        """The public key for ``kid``, reloading once in a while on a miss."""
+        if kid is None:
+            return None
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_reload > 1.0:
+            # Another worker may have rotated the keys.
+            self.reload()
+            key = self._keys.get(kid)
+        return key.public_key if key is not None else None
+
+    def jwks(self) -> dict:
+        """The public keys of every published key, as a JWK set."""
+        if not self._keys:
+            self.reload()
+        return {"keys": [key.jwk for key in self._keys.values()]}
+
+    def reset(self):
+        self._keys = {}
+        self._last_reload = 0.0
+
+
+key_store = KeyStore(
+    directory=settings.JWT_KEYS_DIR,
+    algorithm=settings.ALGORITHM,
+    rotation=settings.JWT_KEY_ROTATION_DAYS * 86400,
+    overlap=settings.JWT_KEY_OVERLAP_SECONDS,
+    # Other workers load a new key within one check interval, then clients may
+    # keep the JWKS they fetched just before for max-age.
+    activation_delay=settings.JWKS_MAX_AGE_SECONDS
+    + settings.JWT_KEY_CHECK_INTERVAL_SECONDS,
+)
+
+
+async def rotate_keys_forever(store: KeyStore):
+    """Background task rotating the signing keys on schedule."""
+    while True:
+        await asyncio.sleep(settings.JWT_KEY_CHECK_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(store.rotate)
+        except Exception as e:
+            logger.error(f"Failed to rotate signing keys: {e}")
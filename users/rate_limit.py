@@ -0,0 +1,221 @@
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from common.config import settings
+from common.logger_config import logger
+from common.metrics import registry
+from users.exceptions import TooManyRequestsException
+
+
+def _sliding_window(
+    now: float, window: float, start: float, current: int, previous: int
+) -> tuple[float, int, int]:
+    # Roll the fixed windows forward to the one containing ``now``.
+    elapsed_windows = int((now - start) // window)
+    if elapsed_windows == 1:
+        start, previous, current = start + window, current, 0
+    elif elapsed_windows > 1:
+        start = start + elapsed_windows * window
+        previous, current = 0, 0
+    return start, current, previous
+
+
+def _estimate(now: float, window: float, start: float, current: int, previous: int):
+    # Weight the previous window by how much of it still overlaps the
+    # sliding window ending at ``now``.
+    weight = 1 - (now - start) / window
+    return previous * weight + current
+
+
+def _retry_after(now, window, start, current, previous, limit) -> float:
+    # Time until the previous window's weight drops enough to let one more in.
+    if previous and current < limit:
+        needed_weight = (limit - current - 1) / previous
+        return max(start + window * (1 - needed_weight) - now, 0.001)
+    # The current window is used up. Once it rolls over its count becomes the
+    # previous one, still weighted close to 1, so wait until it has decayed.
+    needed_weight = (limit - 1) / current if current else 0
+    return start + window * (2 - needed_weight) - now
+
+
+class MemoryRateLimitBackend:
+    """Sliding window counters kept in the worker's memory.
+
+    Args:
+        max_keys (int): Number of tracked keys above which stale ones are
+            pruned, then the least recently hit ones evicted.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # Pruning goes down to this, so it runs once per batch of new keys.
+        self.low_water = max_keys * 9 // 10
+        # Least recently hit first; each entry keeps the window it counts in.
+        self._windows: OrderedDict[str, tuple[float, int, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.time()
+        with self._lock:
+            start, current, previous, _ = self._windows.get(key, (now, 0, 0, window))
+            start, current, previous = _sliding_window(
+                now, window, start, current, previous
+            )
+            if _estimate(now, window, start, current, previous) >= limit:
+                self._windows[key] = (start, current, previous, window)
+                self._windows.move_to_end(key)
+                return _retry_after(now, window, start, current, previous, limit)
+
+            self._windows[key] = (start, current + 1, previous, window)
+            self._windows.move_to_end(key)
+            if len(self._windows) > self.max_keys:
+                self._prune(now)
+            return 0.0
+
+    def _prune(self, now: float):
+        # An entry no longer counts once both of its fixed windows are over.
+        expired = [
+            key
+            for key, (start, _, _, window) in self._windows.items()
+            if now - start >= 2 * window
+        ]
+        for key in expired:
+            del self._windows[key]
+        while len(self._windows) > self.low_water:
+            self._windows.popitem(last=False)
+
+    def reset(self):
+        with self._lock:
+            self._windows.clear()
+
+
+class SQLiteRateLimitBackend:
+    """Sliding window counters in a SQLite file shared by every local worker.
+
+    Each row keeps when it stops counting, two of its windows after its
+    start, so rows of keys that went quiet are deleted every ``prune_every``
+    hits whatever window they were counted in.
+
+    Args:
+        path (str): Path of the SQLite database file.
+        prune_every (int): Hits between two deletions of expired rows.
+    """
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._hits = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, start REAL NOT NULL, "
+                "current INTEGER NOT NULL, previous INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL DEFAULT 0)"
+            )
+            columns = {
+                row[1] for row in conn.execute("PRAGMA table_info(rate_limits)")
+            }
+            # Files created before expiry was tracked: their rows go first.
+            if "expires_at" not in columns:
+                conn.execute(
+                    "ALTER TABLE rate_limits "
+                    "ADD COLUMN expires_at REAL NOT NULL DEFAULT 0"
+                )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rate_limits_expires_at "
+                "ON rate_limits (expires_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _hit(self, key: str, limit: int, window: float) -> float:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT start, current, previous FROM rate_limits WHERE key = ?",
+                (key,),
+            ).fetchone()
+            start, current, previous = row or (now, 0, 0)
+            start, current, previous = _sliding_window(
+                now, window, start, current, previous
+            )
+            retry_after = 0.0
+            if _estimate(now, window, start, current, previous) >= limit:
+                retry_after = _retry_after(now, window, start, current, previous, limit)
+            else:
+                current += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits "
+                "(key, start, current, previous, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, start, current, previous, start + 2 * window),
+            )
+            self._hits += 1
+            if self._hits % self.prune_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+            return retry_after
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        return await asyncio.to_thread(self._hit, key, limit, window)
+
+    def reset(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM rate_limits")
+
+
+class RateLimiter:
+    """Reject callers that exceed a request budget for a key.
+
+    Args:
+        backend: Storage of the counters, in memory or shared between workers.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.rejected = 0
+
+    async def check(self, key: str, limit: int, window: float):
+        """Count one hit for ``key`` and raise 429 if it is over ``limit``.
+
+        Raises:
+            TooManyRequestsException: With the seconds to wait in Retry-After.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        retry_after = await self.backend.hit(key, limit, window)
+        if retry_after > 0:
+            self.rejected += 1
+            logger.warning(f"Rate limit exceeded for {key}.")
+            raise TooManyRequestsException(retry_after=math.ceil(retry_after))
+
+    def reset(self):
+        self.backend.reset()
+
+
+def _build_backend():
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH)
+    return MemoryRateLimitBackend()
+
+
+rate_limiter = RateLimiter(_build_backend())
+registry.register_collector(
+    "rate_limiter", lambda: {"rejected": rate_limiter.rejected}
+)
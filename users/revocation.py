@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime
+
+from common.bloom import BloomFilter
+from common.cache import Cache, build_cache_backend
+from common.config import settings
+from common.logger_config import logger
+from common.metrics import registry
+from db.querys import (
+    find_revoked_jtis_query,
+    is_token_revoked_query,
+    list_revoked_jtis_query,
+    purge_revoked_tokens_query,
+    revoke_token_query,
+)
+
+
+class TokenDenylist:
+    """Revoked access token ids, fronted by an in-memory Bloom filter.
+
+    The denylist table is the source of truth. The Bloom filter holds every
+    id revoked before the last rebuild plus those revoked by this process, so
+    a token it does not contain is known to be valid without any query. Only
+    maybe-revoked tokens, real or false positives, cost a lookup.
+
+    Every revocation bumps the version of the ``versions`` cache namespace.
+    With a shared cache backend the other workers see the new version within
+    its check interval and rebuild their filter before answering.
+
+    Args:
+        capacity (int): Number of revoked ids the filter is sized for.
+        error_rate (float): False positive rate of the filter at capacity.
+        versions (Cache | None): Namespace whose version tracks revocations.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        error_rate: float = 0.01,
+        versions: Cache | None = None,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.versions = versions
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._version = 0
+
+        self.skipped = 0
+        self.lookups = 0
+        self.false_positives = 0
+
+    async def rebuild(self, db) -> int:
+        """Reload the filter from the unexpired denylist entries."""
+        # Read the version first, a revocation racing the query bumps it again.
+        version = await self.versions.version() if self.versions else 0
+        jtis = await list_revoked_jtis_query(db)
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._version = version
+        return len(jtis)
+
+    async def _sync(self, db):
+        if self.versions is None:
+            return
+        if await self.versions.version() != self._version:
+            await self.rebuild(db)
+
+    async def revoke(self, jti: str, expires_at: datetime, db):
+        await revoke_token_query(jti, expires_at, db)
+        self._bloom.add(jti)
+        if self.versions is not None:
+            # The namespace holds no entries, clearing it only bumps its version.
+            await self.versions.clear()
+
+    async def is_revoked(self, jti: str, db) -> bool:
+        await self._sync(db)
+        if jti not in self._bloom:
+            self.skipped += 1
+            return False
+
+        self.lookups += 1
+        revoked = await is_token_revoked_query(jti, db)
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def find_revoked(self, jtis: list[str], db) -> set[str]:
+        """Batch version of ``is_revoked``: one query for every maybe-revoked id."""
+        await self._sync(db)
+        candidates = [jti for jti in jtis if jti in self._bloom]
+        self.skipped += len(jtis) - len(candidates)
+        if not candidates:
+            return set()
+
+        self.lookups += len(candidates)
+        revoked = await find_revoked_jtis_query(candidates, db)
+        self.false_positives += len(candidates) - len(revoked)
+        return revoked
+
+    def reset(self):
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+
+    def stats(self) -> dict:
+        return {
+            **self._bloom.stats(),
+            "skipped": self.skipped,
+            "lookups": self.lookups,
+            "false_positives": self.false_positives,
+        }
+
+
+denylist = TokenDenylist(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+    versions=Cache(
+        build_cache_backend(),
+        namespace="token_denylist",
+        version_check_interval=settings.CACHE_VERSION_CHECK_SECONDS,
+    ),
+)
+registry.register_collector("token_denylist", denylist.stats)
+
+
+async def refresh_denylist_forever(session_factory):
+    """Background task purging expired denylist entries and rebuilding the filter.
+
+    The rebuild also picks up tokens revoked by other workers when the cache
+    backend is not shared.
+    """
+    while True:
+        await asyncio.sleep(settings.REVOCATION_REFRESH_INTERVAL_SECONDS)
+        try:
+            async with session_factory() as session:
+                await purge_revoked_tokens_query(session)
+                await denylist.rebuild(session)
+        except Exception as e:
+            logger.error(f"Failed to refresh the token denylist: {e}")
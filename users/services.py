@@ -1,21 +1,41 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 
 import jwt
 from db.schemas import UsersDB
-from fastapi import Depends
+from fastapi import BackgroundTasks, Depends
 from typing import Annotated
 from jwt.exceptions import InvalidTokenError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
-from db.access import get_db
+from db.access import get_db, get_read_db
+from common.cache import TTLCache
+from common.metrics import registry, stage_duration
 from common.logger_config import logger
 from common.config import get_settings
 from db.exceptions import DatabaseConnectionError, UserNotFoundException
-from db.querys import get_user
-from models.models import TokenData, UserCreate, UserFeatures
-from users.helper import oauth2_scheme, verify_password
-from users.exceptions import CredentialsException, InactiveUserException
+from db.querys import (
+    get_token_version,
+    get_user,
+    get_users,
+    update_password_hash_query,
+)
+from models.models import TokenData, UserCreate, UserFeatures, UserPublic, UserRecord
+from users.hashing import password_hasher
+from users.helper import oauth2_scheme
+from users.keys import key_store
+from users.breached import is_breached_password
+from users.exceptions import (
+    CredentialsException,
+    ForbiddenException,
+    InactiveUserException,
+    InvalidRequestException,
+    ServiceUnavailableException,
+)
+from users.revocation import denylist
 from common.config import settings
 
 
@@ -29,15 +49,47 @@ SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
 SUPERUSER_PASSWORD = settings.FIRST_SUPERUSER_PASSWORD
 
 
-async def authenticate_user(username: str, password: str, db: Depends(get_db)):
-    user = await get_user(username, db)
+token_cache = TTLCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
+registry.register_collector("token_cache", token_cache.stats)
+
+
+async def authenticate_user(
+    username: str,
+    password: str,
+    db: Depends(get_db),
+    background_tasks: BackgroundTasks | None = None,
+    session_factory=None,
+):
+    try:
+        user = await get_user(username, db)
+    except UserNotFoundException:
+        return False
     if not user:
         return False
-    if not verify_password(password, user.password):
+
+    verified, new_hash = await password_hasher.verify_and_update(
+        password, user.password
+    )
+    if not verified:
         return False
+
+    # The stored hash uses an old scheme or cost: upgrade it after responding.
+    if new_hash and background_tasks is not None and session_factory is not None:
+        background_tasks.add_task(
+            rehash_password, session_factory, user.username, new_hash
+        )
     return user
 
 
+async def rehash_password(session_factory, username: str, new_hash: str):
+    try:
+        async with session_factory() as session:
+            await update_password_hash_query(username, new_hash, session)
+        logger.info(f"Password hash of {username} upgraded.")
+    except Exception as e:
+        logger.error(f"Failed to upgrade password hash of {username}: {e}")
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -45,13 +97,107 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # A unique id lets a single token be revoked before it expires.
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    with stage_duration.time("jwt_encode"):
+        if key_store.asymmetric:
+            key = key_store.signing_key()
+            return jwt.encode(
+                to_encode,
+                key.private_key,
+                algorithm=key_store.algorithm,
+                headers={"kid": key.kid},
+            )
+        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Annotated[AsyncSession, Depends(get_db)],):
+def _verify_token(token: str) -> dict:
+    if not key_store.asymmetric:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    public_key = key_store.verification_key(jwt.get_unverified_header(token).get("kid"))
+    if public_key is None:
+        raise InvalidTokenError("Unknown signing key")
+    return jwt.decode(token, public_key, algorithms=[key_store.algorithm])
+
+
+def access_token_claims(user: UserRecord) -> dict:
+    """Build the claims put in an access token issued to ``user``.
+
+    With STATELESS_AUTH the token also carries the public user fields and
+    the user's token version, so authenticated reads can skip the database.
+    """
+    claims = {"sub": user.username}
+    if settings.STATELESS_AUTH:
+        claims.update(
+            {
+                "uid": user.id,
+                "email": user.email,
+                "is_active": user.is_active,
+                "ver": user.token_version,
+            }
+        )
+    return claims
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def decode_access_token(token: str) -> dict:
+    """Verify a JWT and return its claims, reusing earlier verifications.
+
+    Verified claims are cached under a digest of the token until the token's
+    own ``exp``, so a token reused by a client is only decoded once.
+
+    Raises:
+        InvalidTokenError: If the token signature or claims are invalid.
+    """
+    if not settings.TOKEN_CACHE_ENABLED:
+        with stage_duration.time("jwt_decode"):
+            return _verify_token(token)
+
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    with stage_duration.time("jwt_decode"):
+        payload = _verify_token(token)
+
+    exp = payload.get("exp")
+    if exp is not None:
+        token_cache.set(key, payload, ttl=exp - time.time())
+    return payload
+
+
+def purge_token_cache(token: str | None = None):
+    """Forget one verified token, or every cached token when none is given."""
+    if token is None:
+        token_cache.clear()
+    else:
+        token_cache.delete(_token_key(token))
+
+
+async def revoke_access_token(token: str, db: AsyncSession):
+    """Deny a valid access token until its expiry.
+
+    Raises:
+        InvalidTokenError: If the token is invalid or has no ``jti``.
+    """
+    payload = decode_access_token(token)
+    if "jti" not in payload or "exp" not in payload:
+        raise InvalidTokenError("Token cannot be revoked")
+
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    await denylist.revoke(payload["jti"], expires_at.replace(tzinfo=None), db)
+    purge_token_cache(token)
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Annotated[AsyncSession, Depends(get_read_db)],):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username = payload.get("sub")
         if username is None:
             raise CredentialsException(detail=["Could not validate credentials"])
@@ -61,6 +207,13 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: An
         logger.info("Invalid token.")
         raise CredentialsException(detail=["Invalid token"])
 
+    jti = payload.get("jti")
+    if jti is not None and await denylist.is_revoked(jti, db):
+        raise CredentialsException(detail=["Token has been revoked"])
+
+    if settings.STATELESS_AUTH and "ver" in payload:
+        return await _user_from_claims(payload, db)
+
     try:
         user = await get_user(username=token_data.username, db=db)
         if user is None:
@@ -72,17 +225,91 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: An
         raise DatabaseConnectionError(detail=["Database connection error"])
 
 
+async def introspect_tokens(tokens: list[str], db: AsyncSession) -> list[dict]:
+    """Report whether each token is active, with a fixed number of queries.
+
+    Tokens are decoded in one pass, then their distinct subjects are resolved
+    together and their ids checked against the denylist together, whatever
+    the number of tokens.
+
+    Returns:
+        list[dict]: One result per token, in order, with ``active`` set and
+            the claims of the active ones.
+    """
+    payloads = []
+    for token in tokens:
+        try:
+            payloads.append(decode_access_token(token))
+        except InvalidTokenError:
+            payloads.append(None)
+
+    valid = [payload for payload in payloads if payload and payload.get("sub")]
+    users = await get_users([payload["sub"] for payload in valid], db)
+    revoked = await denylist.find_revoked(
+        list({payload["jti"] for payload in valid if "jti" in payload}), db
+    )
+
+    results = []
+    for payload in payloads:
+        user = users.get(payload.get("sub")) if payload else None
+        active = (
+            user is not None
+            and user.is_active is not False
+            and payload.get("jti") not in revoked
+            and payload.get("ver", user.token_version) == user.token_version
+        )
+        if not active:
+            results.append({"active": False})
+            continue
+        results.append(
+            {
+                "active": True,
+                "sub": user.username,
+                "uid": user.id,
+                "email": user.email,
+                "exp": payload.get("exp"),
+                "jti": payload.get("jti"),
+            }
+        )
+    return results
+
+
+async def _user_from_claims(payload: dict, db: AsyncSession) -> UserPublic:
+    try:
+        token_version = await get_token_version(payload["uid"], db)
+    except DatabaseConnectionError as e:
+        logger.error(f"Database connection error during token version check: {e}")
+        raise ServiceUnavailableException(detail="Database connection error") from e
+
+    if token_version is None or token_version != payload["ver"]:
+        raise CredentialsException(detail=["Token has been revoked"])
+
+    return UserPublic(
+        id=payload["uid"],
+        username=payload["sub"],
+        email=payload["email"],
+        is_active=payload["is_active"],
+    )
+
+
 async def get_current_active_user(
-    current_user: Annotated[UserCreate, Depends(get_current_user)],
+    current_user: Annotated[UserRecord, Depends(get_current_user)],
 ):
     if current_user.is_active is False:
         raise InactiveUserException
     return current_user
 
 
+async def get_current_superuser(
+    current_user: Annotated[UserRecord, Depends(get_current_active_user)],
+):
+    if current_user.username != SUPERUSER_USERNAME:
+        raise ForbiddenException
+    return current_user
+
+
 from sqlalchemy import select
 from db.engine import AsyncSessionLocal
-from users.helper import get_password_hash
 from models.models import UserFeatures
 from common.logger_config import logger
 
@@ -98,7 +325,7 @@ async def create_initial_admin_user(db: AsyncSessionLocal()):
         first_user = UsersDB(
             username=SUPERUSER_USERNAME,
             email=SUPERUSER_EMAIL,
-            password=get_password_hash(SUPERUSER_PASSWORD),
+            password=await password_hasher.hash_password(SUPERUSER_PASSWORD),
             is_active=True,
         )
         db.add(first_user)
@@ -108,7 +335,7 @@ async def create_initial_admin_user(db: AsyncSessionLocal()):
         logger.error(f"❌ Échec de la création de l'utilisateur admin initial : {e}")
 
 
-def validate_user(user: UserFeatures) -> UserCreate:
+async def validate_user(user: UserFeatures) -> UserCreate:
     try:
         validated_user = UserCreate(
             username=user.username,
@@ -119,7 +346,16 @@ def validate_user(user: UserFeatures) -> UserCreate:
     except Exception as e:
         logger.error(f"Validation error: {e}")
         raise CredentialsException(detail=["Invalid user data"])
-    
-    validate_user.password = get_password_hash(validated_user.password)
-    
+
+    with stage_duration.time("breached_check"):
+        breached = is_breached_password(validated_user.password)
+    if breached:
+        raise InvalidRequestException(
+            detail="Password appears in a known data breach"
+        )
+
+    validated_user.password = await password_hasher.hash_password(
+        validated_user.password
+    )
+
     return validated_user
\ No newline at end of file
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import secrets
+from datetime import timedelta
+
+from common.config import settings
+from common.logger_config import logger
+from db.querys import (
+    create_session_query,
+    get_session_query,
+    purge_expired_sessions_query,
+    revoke_user_sessions_query,
+    rotate_session_query,
+    utcnow,
+)
+from models.models import Token
+from users.exceptions import CredentialsException
+from users.services import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    access_token_claims,
+    create_access_token,
+)
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    # Refresh tokens are long random strings, a fast digest is enough.
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def _new_refresh_token() -> tuple[str, str]:
+    refresh_token = secrets.token_urlsafe(32)
+    return refresh_token, hash_refresh_token(refresh_token)
+
+
+def _refresh_expiry():
+    return utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+async def issue_refresh_token(user_id: int, db) -> str:
+    """Open a new refresh token session for a user and return the token."""
+    refresh_token, token_hash = _new_refresh_token()
+    await create_session_query(user_id, token_hash, _refresh_expiry(), db)
+    return refresh_token
+
+
+async def refresh_session(refresh_token: str, db) -> tuple[Token, str, int]:
+    """Exchange a refresh token for a new access token and a rotated refresh token.
+
+    Presenting a token that was already rotated means it leaked: every
+    session of its user is revoked.
+
+    Returns:
+        tuple[Token, str, int]: The new tokens, then the username and id of
+            the session's user.
+
+    Raises:
+        CredentialsException: If the refresh token is unknown, expired,
+            revoked, reused or belongs to an inactive user.
+    """
+    row = await get_session_query(hash_refresh_token(refresh_token), db)
+    if row is None:
+        raise CredentialsException(detail=["Invalid refresh token"])
+
+    session, user = row
+    if session.rotated_at is not None:
+        logger.warning(
+            f"Refresh token reuse detected for user {user.username}, "
+            "revoking all sessions."
+        )
+        await revoke_user_sessions_query(user.id, db)
+        raise CredentialsException(detail=["Refresh token reuse detected"])
+
+    if session.revoked_at is not None or session.expires_at <= utcnow():
+        raise CredentialsException(detail=["Refresh token expired or revoked"])
+    if not user.is_active:
+        raise CredentialsException(detail=["Inactive user"])
+
+    # Read everything off the ORM rows before the commits below expire them.
+    claims = access_token_claims(user)
+    username, user_id = user.username, user.id
+    new_refresh_token, new_token_hash = _new_refresh_token()
+    rotated = await rotate_session_query(
+        session.id, user_id, new_token_hash, _refresh_expiry(), db
+    )
+    if not rotated:
+        # A concurrent request rotated the same token first.
+        await revoke_user_sessions_query(user_id, db)
+        raise CredentialsException(detail=["Refresh token reuse detected"])
+
+    access_token = create_access_token(
+        data=claims,
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    token = Token(
+        access_token=access_token,
+        token_type="bearer",
+        refresh_token=new_refresh_token,
+    )
+    return token, username, user_id
+
+
+async def purge_expired_sessions_forever(session_factory):
+    """Background task deleting expired sessions every purge interval."""
+    while True:
+        await asyncio.sleep(settings.SESSION_PURGE_INTERVAL_SECONDS)
+        try:
+            async with session_factory() as session:
+                purged = await purge_expired_sessions_query(
+                    session, batch_size=settings.SESSION_PURGE_BATCH_SIZE
+                )
+            if purged:
+                logger.info(f"Purged {purged} expired sessions.")
+        except Exception as e:
+            logger.error(f"Failed to purge expired sessions: {e}")